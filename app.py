@@ -1,11 +1,38 @@
-from flask import Flask, jsonify, request, send_from_directory, render_template
+from flask import Flask, Response, jsonify, request, send_from_directory, render_template
+import json
 import os
 import time
 import random
 from smo_aco import solve_mtsp
+from jobs import JobQueue, QueueFullError
+from cache import SolutionCache, cache_key
+from incremental import update_routes
+from batch import solve_batch
+from tuning import tune
+from instrumentation import MetricsRegistry
 
 app = Flask(__name__, static_folder='.', static_url_path='')
 
+# Number of processes used to solve clusters in parallel (1 = sequential)
+SOLVER_WORKERS = int(os.environ.get('SOLVER_WORKERS', os.cpu_count() or 1))
+
+# Skip clustering methods whose quick estimate is this fraction worse than the best
+PRUNE_MARGIN = float(os.environ.get('PRUNE_MARGIN', 0.05))
+
+# Background solves: how many run at once and how many may wait
+job_queue = JobQueue(max_workers=int(os.environ.get('JOB_WORKERS', 2)),
+                     max_pending=int(os.environ.get('JOB_MAX_PENDING', 100)))
+
+# Solutions of repeated requests; SOLUTION_CACHE_DISK=1 also keeps them in solutions/cache
+solution_cache = SolutionCache(
+    max_entries=int(os.environ.get('SOLUTION_CACHE_SIZE', 256)),
+    ttl=float(os.environ.get('SOLUTION_CACHE_TTL', 3600)),
+    directory=(os.path.join(os.path.dirname(__file__), 'solutions', 'cache')
+               if os.environ.get('SOLUTION_CACHE_DISK') == '1' else None))
+
+# Phase timings and solver counters of every /solve, served at /metrics
+solver_metrics = MetricsRegistry()
+
 @app.route('/')
 def index():
     """Serve the main page of the application."""
@@ -16,6 +43,58 @@ def serve_static(path):
     """Serve static files from the current directory."""
     return send_from_directory('.', path)
 
+def solve_params(data):
+    """Keyword arguments for solve_mtsp from a /solve style request body."""
+    return {
+        'depot': data['depot'],  # {lat, lng}
+        'locations': data['locations'],  # [{lat, lng}, ...]
+        'num_salesmen': data['numSalesmen'],
+        'algorithm': data['algorithm'],  # 'smo-aco', 'smo', 'aco' or 'lk'
+        'workers': data.get('workers', SOLVER_WORKERS),  # Processes for per-cluster solves
+        'seed': data.get('seed'),  # Optional, for reproducible results
+        'prune_margin': data.get('pruneMargin', PRUNE_MARGIN),  # None routes every clustering
+        'objective': data.get('objective', 'total'),  # 'total' or 'minmax' (longest route)
+        'capacity': data.get('capacity'),  # Optional maximum stops per agent
+        'time_limit': data['timeLimitMs'] / 1000 if data.get('timeLimitMs') is not None else None,
+        'stagnation_limit': data.get('stagnationLimit'),  # Iterations without improvement
+        'min_improvement': data.get('minImprovement', 0.0),  # Relative gain that counts as improvement
+        'initial_routes': warm_start_routes(data.get('warmStart')),  # Previous solution to start from
+        'params': data.get('params'),  # Solver keyword arguments, e.g. from /optimize
+        'inter_route': data.get('interRoute', False)  # Move stops between finished routes
+    }
+
+def warm_start_routes(warm_start):
+    """Routes of a previous solution, given inline or as the filename of a saved one."""
+    if warm_start is None:
+        return None
+    if isinstance(warm_start, str):
+        file_path = os.path.join(os.path.dirname(__file__), 'solutions', os.path.basename(warm_start))
+        with open(file_path, 'r') as f:
+            warm_start = json.load(f)
+    if isinstance(warm_start, dict):
+        warm_start = warm_start['routes']
+    return warm_start
+
+def cached_solve(params):
+    """solve_mtsp(**params), answered from the solution cache when possible.
+    
+    Fresh solves are profiled into ``solver_metrics`` and carry their
+    'profile'; cached ones do not.
+    """
+    key = cache_key(params)
+    solution = solution_cache.get(key)
+    if solution is not None:
+        solution['cached'] = True
+        return solution
+    
+    solution = solve_mtsp(**params, profile=True)
+    profile = solution.pop('profile')
+    solver_metrics.add(params['algorithm'], solution['time'], profile)
+    solution_cache.put(key, solution)
+    solution['cached'] = False
+    solution['profile'] = profile
+    return solution
+
 @app.route('/solve', methods=['POST'])
 def solve():
     """Solve the mTSP problem with the given parameters."""
@@ -24,16 +103,15 @@ def solve():
         data = request.get_json()
         
         # Extract parameters
-        depot = data['depot']  # {lat, lng}
-        locations = data['locations']  # [{lat, lng}, ...]
-        num_salesmen = data['numSalesmen']
-        algorithm = data['algorithm']  # 'smo-aco', 'smo', or 'aco'
+        params = solve_params(data)
         
         # Start timer
         start_time = time.time()
         
-        # Solve mTSP
-        solution = solve_mtsp(depot, locations, num_salesmen, algorithm)
+        # Solve mTSP, unless the same request was solved before
+        solution = cached_solve(params)
+        if not data.get('profile'):
+            solution.pop('profile', None)
         
         # Calculate computation time
         computation_time = (time.time() - start_time) * 1000  # Convert to milliseconds
@@ -43,6 +121,14 @@ def solve():
         
         return jsonify(solution)
     
+    except (KeyError, ValueError) as e:
+        return jsonify({
+            'error': str(e),
+            'routes': [],
+            'totalDistance': 0,
+            'computationTime': 0
+        }), 400
+    
     except Exception as e:
         print(f"Error solving mTSP: {str(e)}")
         return jsonify({
@@ -52,6 +138,164 @@ def solve():
             'computationTime': 0
         }), 500
 
+@app.route('/batch', methods=['POST'])
+def solve_many():
+    """Solve a list of independent instances, streaming results as NDJSON.
+    
+    Each instance has the same fields as a /solve request plus an optional
+    'id'. One JSON line per instance is sent as soon as it is solved, in
+    completion order, with its 'index' and 'id' and either the solution or
+    an 'error'. Instances are solved across SOLVER_WORKERS processes.
+    """
+    try:
+        data = request.get_json()
+        instances = []
+        for instance in data['instances']:
+            params = solve_params(instance)
+            if 'id' in instance:
+                params['id'] = instance['id']
+            instances.append(params)
+    
+    except Exception as e:
+        return jsonify({
+            'error': str(e)
+        }), 400
+    
+    def stream():
+        for result in solve_batch(instances, workers=data.get('workers', SOLVER_WORKERS)):
+            yield json.dumps(result) + '\n'
+    
+    return Response(stream(), mimetype='application/x-ndjson', headers={
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/routes/update', methods=['POST'])
+def update_solution_routes():
+    """Apply stop insertions, removals and moves to existing routes.
+    
+    Only the routes an edit touches are re-optimized, so small changes do
+    not need a full /solve. The response carries the updated locations,
+    since removals renumber the stops after them.
+    """
+    try:
+        data = request.get_json()
+        
+        start_time = time.time()
+        
+        solution = update_routes(data['depot'], data['locations'], data['routes'],
+                                 data.get('operations', []), objective=data.get('objective', 'total'))
+        
+        solution['computationTime'] = (time.time() - start_time) * 1000
+        
+        return jsonify(solution)
+    
+    except (KeyError, ValueError) as e:
+        return jsonify({
+            'error': str(e)
+        }), 400
+    
+    except Exception as e:
+        print(f"Error updating routes: {str(e)}")
+        return jsonify({
+            'error': str(e)
+        }), 500
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Solver metrics of all /solve requests in the Prometheus text format."""
+    return Response(solver_metrics.to_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """Queue an mTSP solve and return its job id immediately."""
+    try:
+        job = job_queue.submit(solve_params(request.get_json()))
+        return jsonify(job.to_dict()), 202
+    
+    except QueueFullError as e:
+        return jsonify({
+            'error': str(e)
+        }), 503
+    
+    except Exception as e:
+        print(f"Error submitting job: {str(e)}")
+        return jsonify({
+            'error': str(e)
+        }), 400
+
+@app.route('/jobs', methods=['GET'])
+def list_jobs():
+    """List all known jobs without their results."""
+    return jsonify({
+        'jobs': [job.to_dict(include_result=False) for job in job_queue.list()]
+    })
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Get a job's status, and its result once done.
+    
+    With ``?wait=<seconds>`` the request blocks until the job finishes or
+    the wait expires (long polling).
+    """
+    wait = min(float(request.args.get('wait', 0)), 60)
+    job = job_queue.wait(job_id, wait) if wait > 0 else job_queue.get(job_id)
+    if job is None:
+        return jsonify({
+            'error': f'No job {job_id}'
+        }), 404
+    return jsonify(job.to_dict())
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """Stream a job's improved solutions as Server-Sent Events.
+    
+    Each improvement arrives as an ``incumbent`` event carrying a solution
+    (routes, totalDistance, computationTime); the stream ends with a
+    ``done``, ``failed`` or ``cancelled`` event carrying the job status.
+    """
+    if job_queue.get(job_id) is None:
+        return jsonify({
+            'error': f'No job {job_id}'
+        }), 404
+    
+    def stream():
+        for event, data in job_queue.updates(job_id):
+            if event is None:
+                yield ': keep-alive\n\n'
+            else:
+                yield f'event: {event}\ndata: {json.dumps(data)}\n\n'
+    
+    return Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    """Get the solution of a finished job."""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({
+            'error': f'No job {job_id}'
+        }), 404
+    if job.status != 'done':
+        return jsonify(job.to_dict()), 409
+    return jsonify(job.result)
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a queued or running job."""
+    if job_queue.get(job_id) is None:
+        return jsonify({
+            'error': f'No job {job_id}'
+        }), 404
+    cancelled = job_queue.cancel(job_id)
+    return jsonify({
+        'jobId': job_id,
+        'cancelled': cancelled,
+        'status': job_queue.get(job_id).status
+    })
+
 @app.route('/info', methods=['GET'])
 def get_info():
     """Provide information about the algorithms used."""
@@ -84,6 +328,15 @@ def get_info():
                     'beta': 2.0,
                     'evaporation_rate': 0.5
                 }
+            },
+            'lk': {
+                'name': 'Iterated Lin-Kernighan',
+                'description': 'Variable-depth local search over nearest-neighbor candidate sets, restarted from random segment swaps; suited to large clusters.',
+                'parameters': {
+                    'iterations': 100,
+                    'neighbors': 8,
+                    'depth': 10
+                }
             }
         },
         'project': {
@@ -94,12 +347,20 @@ def get_info():
                 'Your Name'
             ],
             'institution': 'Your University/College'
-        }
+        },
+        'cache': solution_cache.stats()
     })
 
 @app.route('/compare', methods=['POST'])
 def compare_algorithms():
-    """Compare different algorithms on the same problem instance."""
+    """Compare different algorithms on the same problem instance.
+    
+    Every algorithm is run ``repetitions`` times (1 by default) with seeds
+    ``seed``, ``seed + 1``, ... (``seed`` defaults to 0), the same seeds for
+    every algorithm, and all runs are solved concurrently in separate
+    processes. Each algorithm reports its best run's routes together with
+    the mean, standard deviation and best of its distances and times.
+    """
     try:
         # Get data from the request
         data = request.get_json()
@@ -108,24 +369,63 @@ def compare_algorithms():
         depot = data['depot']
         locations = data['locations']
         num_salesmen = data['numSalesmen']
+        seed = data.get('seed', 0)
+        repetitions = max(1, int(data.get('repetitions', 1)))
+        algorithms = ['smo-aco', 'smo', 'aco', 'lk']
+        
+        # One run per algorithm and seed, reusing cached solutions
+        runs = {algorithm: [] for algorithm in algorithms}
+        pending = []
+        pending_keys = []
+        for algorithm in algorithms:
+            for repetition in range(repetitions):
+                params = {
+                    'depot': depot,
+                    'locations': locations,
+                    'num_salesmen': num_salesmen,
+                    'algorithm': algorithm,
+                    'seed': seed + repetition
+                }
+                key = cache_key(params)
+                solution = solution_cache.get(key)
+                if solution is not None:
+                    runs[algorithm].append(dict(solution, cached=True))
+                else:
+                    pending.append(dict(params, id=algorithm))
+                    pending_keys.append(key)
+        
+        # Solve the rest concurrently
+        for result in solve_batch(pending, workers=data.get('workers', SOLVER_WORKERS)):
+            if 'error' in result:
+                raise RuntimeError(result['error'])
+            algorithm = result['id']
+            solution = {
+                'routes': result['routes'],
+                'totalDistance': result['totalDistance'],
+                'time': result['time']
+            }
+            solution_cache.put(pending_keys[result['index']], solution)
+            runs[algorithm].append(dict(solution, cached=False))
         
         results = {}
-        # Run each algorithm and measure performance
-        for algorithm in ['smo-aco', 'smo', 'aco']:
-            # Start timer
-            start_time = time.time()
-            
-            # Solve with the current algorithm
-            solution = solve_mtsp(depot, locations, num_salesmen, algorithm)
-            
-            # Calculate computation time
-            computation_time = (time.time() - start_time) * 1000
+        for algorithm in algorithms:
+            distances = [run['totalDistance'] for run in runs[algorithm]]
+            times = [run['time'] * 1000 for run in runs[algorithm]]  # Convert to milliseconds
+            best = min(runs[algorithm], key=lambda run: run['totalDistance'])
             
             # Store the results
             results[algorithm] = {
-                'totalDistance': solution['totalDistance'],
-                'computationTime': computation_time,
-                'routes': solution['routes']
+                'totalDistance': best['totalDistance'],
+                'computationTime': sum(times) / len(times),
+                'routes': best['routes'],
+                'cached': all(run['cached'] for run in runs[algorithm]),
+                'repetitions': repetitions,
+                'meanDistance': sum(distances) / len(distances),
+                'stdDistance': standard_deviation(distances),
+                'bestDistance': min(distances),
+                'meanTime': sum(times) / len(times),
+                'stdTime': standard_deviation(times),
+                'bestTime': min(times)
             }
         
         return jsonify(results)
@@ -137,9 +437,22 @@ def compare_algorithms():
             'results': {}
         }), 500
 
+def standard_deviation(values):
+    """Sample standard deviation, 0 for fewer than two values."""
+    if len(values) < 2:
+        return 0.0
+    mean = sum(values) / len(values)
+    return (sum((value - mean) ** 2 for value in values) / (len(values) - 1)) ** 0.5
+
 @app.route('/optimize', methods=['POST'])
 def optimize_parameters():
-    """Find optimal parameters for the selected algorithm."""
+    """Find optimal parameters for the selected algorithm.
+    
+    Configurations race by successive halving over repeated seeds (see
+    ``tuning.tune``); ``grid`` may replace the default search space with
+    solver keyword arguments mapped to candidate values. The winning
+    parameters can be passed back to /solve as ``params``.
+    """
     try:
         # Get data from the request
         data = request.get_json()
@@ -150,13 +463,10 @@ def optimize_parameters():
         num_salesmen = data['numSalesmen']
         algorithm = data['algorithm']
         
-        # Best parameters will depend on the algorithm
-        if algorithm == 'smo':
-            best_params = optimize_smo_params(depot, locations, num_salesmen)
-        elif algorithm == 'aco':
-            best_params = optimize_aco_params(depot, locations, num_salesmen)
-        else:  # smo-aco
-            best_params = optimize_hybrid_params(depot, locations, num_salesmen)
+        time_limit = data['timeLimitMs'] / 1000 if data.get('timeLimitMs') is not None else None
+        best_params = tune(depot, locations, num_salesmen, algorithm, grid=data.get('grid'),
+                           max_seeds=data.get('maxSeeds', 9), seed=data.get('seed', 0),
+                           workers=data.get('workers', SOLVER_WORKERS), time_limit=time_limit)
         
         return jsonify(best_params)
     
@@ -166,76 +476,6 @@ def optimize_parameters():
             'error': str(e)
         }), 500
 
-def optimize_smo_params(depot, locations, num_salesmen):
-    """Find optimal parameters for SMO."""
-    # Simple grid search for demonstration
-    best_distance = float('inf')
-    best_params = {}
-    
-    for monkeys in [10, 20, 30]:
-        for iterations in [30, 50, 70]:
-            # Modify solve_mtsp to use these parameters
-            # For now, we'll just call the default implementation
-            solution = solve_mtsp(depot, locations, num_salesmen, 'smo')
-            
-            if solution['totalDistance'] < best_distance:
-                best_distance = solution['totalDistance']
-                best_params = {
-                    'monkeys': monkeys,
-                    'iterations': iterations,
-                    'totalDistance': best_distance
-                }
-    
-    return best_params
-
-def optimize_aco_params(depot, locations, num_salesmen):
-    """Find optimal parameters for ACO."""
-    # Simple grid search for demonstration
-    best_distance = float('inf')
-    best_params = {}
-    
-    for ants in [10, 20, 30]:
-        for alpha in [0.5, 1.0, 1.5]:
-            for beta in [1.0, 2.0, 3.0]:
-                # Modify solve_mtsp to use these parameters
-                # For now, we'll just call the default implementation
-                solution = solve_mtsp(depot, locations, num_salesmen, 'aco')
-                
-                if solution['totalDistance'] < best_distance:
-                    best_distance = solution['totalDistance']
-                    best_params = {
-                        'ants': ants,
-                        'alpha': alpha,
-                        'beta': beta,
-                        'totalDistance': best_distance
-                    }
-    
-    return best_params
-
-def optimize_hybrid_params(depot, locations, num_salesmen):
-    """Find optimal parameters for hybrid SMO-ACO."""
-    # Simple grid search for demonstration
-    best_distance = float('inf')
-    best_params = {}
-    
-    for monkeys in [10, 20]:
-        for ants in [10, 20]:
-            for iterations in [15, 25]:
-                # Modify solve_mtsp to use these parameters
-                # For now, we'll just call the default implementation
-                solution = solve_mtsp(depot, locations, num_salesmen, 'smo-aco')
-                
-                if solution['totalDistance'] < best_distance:
-                    best_distance = solution['totalDistance']
-                    best_params = {
-                        'monkeys': monkeys,
-                        'ants': ants,
-                        'iterations': iterations,
-                        'totalDistance': best_distance
-                    }
-    
-    return best_params
-
 @app.route('/report', methods=['POST'])
 def generate_report():
     """Generate a detailed report on the solution."""
@@ -0,0 +1,94 @@
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from smo_aco import solve_mtsp
+
+# Batch solving of many independent mTSP instances. Instances are spread
+# over a pool of processes, one instance per process at a time (each solved
+# without a pool of its own), and results are yielded as they complete.
+# Run as a script to solve a file of instances and write NDJSON:
+#
+#     python batch.py instances.json --workers 8 > results.ndjson
+
+def _solve_instance(index, instance_id, params):
+    """Solve one instance; module level so it can run in a worker process."""
+    try:
+        solution = solve_mtsp(**params)
+        solution['computationTime'] = solution['time'] * 1000  # Convert to milliseconds
+        return dict(solution, index=index, id=instance_id)
+    except Exception as e:
+        return {
+            'index': index,
+            'id': instance_id,
+            'error': str(e)
+        }
+
+def solve_batch(instances, workers=None):
+    """Solve every instance and yield its result as soon as it is done.
+    
+    ``instances`` are dicts of ``solve_mtsp`` keyword arguments, optionally
+    with an 'id' that is echoed back. Each result carries the instance's
+    'index' in ``instances`` and its 'id' (the index when none was given),
+    plus either the solution or an 'error'. Results arrive in completion
+    order; ``workers`` processes are used (all cores by default, 1 solves
+    in this process).
+    """
+    tasks = []
+    for index, instance in enumerate(instances):
+        params = dict(instance)
+        instance_id = params.pop('id', index)
+        params['workers'] = None  # Parallelism is across instances
+        tasks.append((index, instance_id, params))
+    
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(tasks) <= 1:
+        for task in tasks:
+            yield _solve_instance(*task)
+        return
+    
+    pool = ProcessPoolExecutor(max_workers=min(workers, len(tasks)))
+    try:
+        futures = [pool.submit(_solve_instance, *task) for task in tasks]
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        # Stop queued solves if the consumer goes away early
+        pool.shutdown(cancel_futures=True)
+
+def read_instances(f):
+    """Instances from a JSON list or from NDJSON (one instance per line)."""
+    text = f.read()
+    if text.lstrip().startswith('['):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Solve many mTSP instances and write results as NDJSON.')
+    parser.add_argument('input', help="JSON list or NDJSON of solve_mtsp arguments ('-' for stdin)")
+    parser.add_argument('--workers', type=int, default=None, help='Processes to use (default: all cores)')
+    parser.add_argument('--output', default='-', help="Where to write results ('-' for stdout)")
+    args = parser.parse_args(argv)
+    
+    if args.input == '-':
+        instances = read_instances(sys.stdin)
+    else:
+        with open(args.input, 'r') as f:
+            instances = read_instances(f)
+    
+    out = sys.stdout if args.output == '-' else open(args.output, 'w')
+    try:
+        failed = 0
+        for result in solve_batch(instances, workers=args.workers):
+            failed += 'error' in result
+            out.write(json.dumps(result) + '\n')
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
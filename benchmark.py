@@ -0,0 +1,289 @@
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from smo_aco import DISTANCE_BLOCK_ROWS, SMO, ACO, HybridSMOACO, LinKernighan, DistanceMatrix, solve_mtsp
+
+# Benchmark suite for the solvers. Instances are TSPLIB files or generated
+# uniform/clustered point sets; every solver runs on every instance with a
+# fixed seed and the time, evaluations per second, gap to the known optimum
+# and peak traced memory of each run are written as JSON, so that results of
+# two versions can be compared before deploying:
+#
+#     python benchmark.py --tsplib eil51.tsp --sizes 50 200 --output new.json
+#     python benchmark.py --sizes 50 200 --baseline old.json
+
+# Optimal tour lengths of common TSPLIB instances
+KNOWN_OPTIMA = {
+    'att48': 10628,
+    'eil51': 426,
+    'berlin52': 7542,
+    'st70': 675,
+    'eil76': 538,
+    'pr76': 108159,
+    'kroA100': 21282,
+    'kroB100': 22141,
+    'rd100': 7910,
+    'eil101': 629,
+    'lin105': 14379,
+    'ch130': 6110,
+    'ch150': 6528,
+    'kroA200': 29368,
+    'a280': 2579,
+    'lin318': 42029,
+    'pcb442': 50778,
+    'rat783': 8806,
+    'pr1002': 259045
+}
+
+SOLVERS = ('smo', 'aco', 'smo-aco', 'lk', 'mtsp')
+DEFAULT_SIZES = (50, 200, 1000)
+
+def tsplib_matrix(coords, edge_weight_type):
+    """Distance matrix of a TSPLIB instance in its own (integer) metric."""
+    if edge_weight_type not in ('EUC_2D', 'CEIL_2D', 'ATT', 'GEO'):
+        raise ValueError(f"Unsupported EDGE_WEIGHT_TYPE: {edge_weight_type}")
+    if edge_weight_type == 'GEO':
+        # Coordinates are DDD.MM degrees and minutes
+        degrees = np.trunc(coords)
+        coords = math.pi * (degrees + 5.0 * (coords - degrees) / 3.0) / 180.0
+    
+    # Filled in row blocks, so the temporaries stay the size of one block
+    matrix = np.empty((len(coords), len(coords)))
+    for start in range(0, len(coords), DISTANCE_BLOCK_ROWS):
+        rows = coords[start:start + DISTANCE_BLOCK_ROWS]
+        matrix[start:start + len(rows)] = _tsplib_block(rows, coords, edge_weight_type)
+    if edge_weight_type == 'GEO':
+        np.fill_diagonal(matrix, 0.0)
+    return matrix
+
+def _tsplib_block(rows, coords, edge_weight_type):
+    """Distances from ``rows`` to every point of ``coords`` (see ``tsplib_matrix``)."""
+    if edge_weight_type == 'GEO':
+        q1 = np.cos(rows[:, 1, None] - coords[None, :, 1])
+        q2 = np.cos(rows[:, 0, None] - coords[None, :, 0])
+        q3 = np.cos(rows[:, 0, None] + coords[None, :, 0])
+        cosine = np.clip(0.5 * ((1.0 + q1) * q2 - (1.0 - q1) * q3), -1.0, 1.0)
+        return np.floor(6378.388 * np.arccos(cosine) + 1.0)
+    
+    diff = rows[:, None, :] - coords[None, :, :]
+    euclidean = np.sqrt((diff ** 2).sum(axis=2))
+    if edge_weight_type == 'EUC_2D':
+        return np.floor(euclidean + 0.5)
+    if edge_weight_type == 'CEIL_2D':
+        return np.ceil(euclidean)
+    pseudo = euclidean / math.sqrt(10.0)  # ATT
+    rounded = np.floor(pseudo + 0.5)
+    return np.where(rounded < pseudo, rounded + 1.0, rounded)
+
+def load_tsplib(path):
+    """Instance from a TSPLIB .tsp file with node coordinates.
+    
+    The first node serves as the depot. Distances, and so the reported
+    lengths, follow the file's EDGE_WEIGHT_TYPE (EUC_2D, CEIL_2D, ATT or GEO).
+    """
+    header = {}
+    coords = []
+    in_coords = False
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line == 'EOF':
+                continue
+            if line == 'NODE_COORD_SECTION':
+                in_coords = True
+            elif in_coords and line[0].isdigit():
+                _, x, y = line.split()[:3]
+                coords.append((float(x), float(y)))
+            elif ':' in line:
+                in_coords = False
+                key, value = line.split(':', 1)
+                header[key.strip()] = value.strip()
+            else:
+                in_coords = False
+    
+    name = header.get('NAME', os.path.splitext(os.path.basename(path))[0])
+    if not coords:
+        raise ValueError(f"{path}: no NODE_COORD_SECTION")
+    coords = np.array(coords)
+    return {
+        'name': name,
+        'kind': 'tsplib',
+        'points': [{'lat': x, 'lng': y} for x, y in coords],
+        'matrix': DistanceMatrix(matrix=tsplib_matrix(coords, header.get('EDGE_WEIGHT_TYPE', 'EUC_2D'))),
+        'optimum': KNOWN_OPTIMA.get(name)
+    }
+
+def generate_instance(num_points, kind='uniform', seed=0):
+    """Random instance of ``num_points`` points around a city centre.
+    
+    ``'uniform'`` spreads the points evenly over the area, ``'clustered'``
+    draws them around a few randomly placed centres, like stops in
+    neighbourhoods. The first point serves as the depot.
+    """
+    rng = np.random.default_rng(seed)
+    centre = np.array([12.97, 77.59])
+    if kind == 'uniform':
+        coords = centre + rng.uniform(-0.1, 0.1, size=(num_points, 2))
+    elif kind == 'clustered':
+        num_centres = max(2, int(math.sqrt(num_points) / 2))
+        centres = centre + rng.uniform(-0.1, 0.1, size=(num_centres, 2))
+        coords = centres[rng.integers(num_centres, size=num_points)] + rng.normal(0, 0.01, size=(num_points, 2))
+    else:
+        raise ValueError(f"Unknown instance kind: {kind}")
+    points = [{'lat': lat, 'lng': lng} for lat, lng in coords]
+    return {
+        'name': f'{kind}{num_points}',
+        'kind': kind,
+        'points': points,
+        'matrix': DistanceMatrix(points),
+        'optimum': None
+    }
+
+class CountingDistanceMatrix(DistanceMatrix):
+    """DistanceMatrix that counts complete route evaluations."""
+    
+    def __init__(self, matrix):
+        super().__init__(matrix=matrix)
+        self.evaluations = 0
+    
+    def route_length(self, route):
+        self.evaluations += 1
+        return super().route_length(route)
+    
+    def route_lengths(self, routes):
+        self.evaluations += len(routes)
+        return super().route_lengths(routes)
+
+def _run(instance, solver, seed, num_salesmen, time_limit):
+    """One solve; returns its length and route evaluations (None when not counted)."""
+    random.seed(seed)
+    np.random.seed(seed)
+    points = instance['points']
+    if solver == 'mtsp':
+        # Solved as the app does, from coordinates; lengths are re-measured
+        # in the instance's metric so gaps stay comparable
+        solution = solve_mtsp(points[0], points[1:], num_salesmen, seed=seed, time_limit=time_limit)
+        return sum(instance['matrix'].route_length(route['route']) for route in solution['routes']), None
+    
+    distance_matrix = CountingDistanceMatrix(instance['matrix'].matrix)
+    solver_class = {'smo': SMO, 'aco': ACO, 'smo-aco': HybridSMOACO, 'lk': LinKernighan}[solver]
+    _, length = solver_class(points, distance_matrix=distance_matrix, time_limit=time_limit).run()
+    return length, distance_matrix.evaluations
+
+def benchmark(instances, solvers=SOLVERS, seed=0, num_salesmen=3, time_limit=None, measure_memory=True):
+    """Run every solver on every instance and return one record per run.
+    
+    Times come from an untraced run; with ``measure_memory`` the run is
+    repeated under tracemalloc (same seed, same work) for its peak memory.
+    The gap to the optimum is only reported for single-tour solves.
+    """
+    records = []
+    for instance in instances:
+        for solver in solvers:
+            start_time = time.perf_counter()
+            length, evaluations = _run(instance, solver, seed, num_salesmen, time_limit)
+            elapsed = time.perf_counter() - start_time
+            
+            peak_memory = None
+            if measure_memory:
+                tracemalloc.start()
+                try:
+                    _run(instance, solver, seed, num_salesmen, time_limit)
+                    peak_memory = tracemalloc.get_traced_memory()[1] / 2**20
+                finally:
+                    tracemalloc.stop()
+            
+            optimum = instance['optimum']
+            single_tour = solver != 'mtsp' or num_salesmen == 1
+            records.append({
+                'instance': instance['name'],
+                'kind': instance['kind'],
+                'nodes': len(instance['points']),
+                'solver': solver,
+                'seed': seed,
+                'length': float(length),
+                'optimum': optimum,
+                'gap': (float(length) - optimum) / optimum if optimum and single_tour else None,
+                'time': elapsed,
+                'evaluations': evaluations,
+                'evaluationsPerSecond': evaluations / elapsed if evaluations is not None and elapsed > 0 else None,
+                'peakMemoryMb': peak_memory
+            })
+    return records
+
+def find_regressions(records, baseline, tolerance=0.2):
+    """Runs of ``records`` slower or longer than in ``baseline`` by more than ``tolerance``."""
+    previous = {(r['instance'], r['solver'], r['seed']): r for r in baseline}
+    regressions = []
+    for record in records:
+        old = previous.get((record['instance'], record['solver'], record['seed']))
+        if old is None:
+            continue
+        for metric in ('time', 'length'):
+            if record[metric] > old[metric] * (1 + tolerance):
+                regressions.append({
+                    'instance': record['instance'],
+                    'solver': record['solver'],
+                    'metric': metric,
+                    'baseline': old[metric],
+                    'value': record[metric]
+                })
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the mTSP solvers and write the results as JSON.')
+    parser.add_argument('--tsplib', nargs='*', default=[], help='TSPLIB .tsp files to include')
+    parser.add_argument('--sizes', nargs='*', type=int, default=list(DEFAULT_SIZES),
+                        help='Sizes of the generated instances')
+    parser.add_argument('--kinds', nargs='*', default=['uniform', 'clustered'], help='Kinds of generated instances')
+    parser.add_argument('--solvers', nargs='*', default=list(SOLVERS), choices=SOLVERS)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--salesmen', type=int, default=3, help='Salesmen for the mtsp solver')
+    parser.add_argument('--time-limit', type=float, default=None, help='Seconds allowed per run')
+    parser.add_argument('--no-memory', action='store_true', help='Skip the traced run for peak memory')
+    parser.add_argument('--output', default='-', help="Where to write the results ('-' for stdout)")
+    parser.add_argument('--baseline', help='Earlier results to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed relative slowdown or lengthening')
+    args = parser.parse_args(argv)
+    
+    instances = [load_tsplib(path) for path in args.tsplib]
+    instances += [generate_instance(size, kind, args.seed) for kind in args.kinds for size in args.sizes]
+    
+    records = benchmark(instances, args.solvers, seed=args.seed, num_salesmen=args.salesmen,
+                        time_limit=args.time_limit, measure_memory=not args.no_memory)
+    report = {
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'timestamp': time.time()
+        },
+        'results': records
+    }
+    
+    status = 0
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            report['regressions'] = find_regressions(records, json.load(f)['results'], args.tolerance)
+        status = 1 if report['regressions'] else 0
+    
+    if args.output == '-':
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    else:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    return status
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Content-addressed cache of mTSP solutions. A solve is identified by a hash
+# of its instance and every parameter that can change the answer, so an
+# identical request is answered from memory (or from disk, when a directory
+# is configured) instead of being solved again.
+
+# solve_mtsp arguments that do not change the solution and are left out of the key
+IGNORED_PARAMS = ('workers', 'callback')
+
+def cache_key(params):
+    """Canonical hash of a set of solve_mtsp keyword arguments."""
+    canonical = {name: value for name, value in params.items() if name not in IGNORED_PARAMS}
+    # Only the coordinates of the points matter, whatever else they carry
+    canonical['depot'] = [params['depot']['lat'], params['depot']['lng']]
+    canonical['locations'] = [[loc['lat'], loc['lng']] for loc in params['locations']]
+    encoded = json.dumps(canonical, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+class SolutionCache:
+    """LRU cache of solutions with a time to live and an optional disk tier.
+
+    At most ``max_entries`` solutions are kept in memory, each for ``ttl``
+    seconds (None keeps them until evicted). With ``directory`` set, every
+    stored solution is also written there as ``<key>.json`` and a memory
+    miss falls back to that file while it is younger than ``ttl``.
+    """
+
+    def __init__(self, max_entries=256, ttl=3600, directory=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.directory = directory
+        self.entries = OrderedDict()  # key -> (stored_at, solution)
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def get(self, key):
+        """The cached solution for ``key`` (a copy), or None."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and self._expired(entry[0]):
+                del self.entries[key]
+                entry = None
+            if entry is None:
+                entry = self._load(key)
+                if entry is not None:
+                    self._remember(key, entry)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry[1])
+
+    def put(self, key, solution):
+        """Store a solution under ``key``."""
+        entry = (time.time(), dict(solution))
+        with self.lock:
+            self._remember(key, entry)
+        if self.directory:
+            self._save(key, entry)
+
+    def clear(self):
+        """Drop every cached solution, on disk as well."""
+        with self.lock:
+            self.entries.clear()
+            if self.directory:
+                for filename in os.listdir(self.directory):
+                    if filename.endswith('.json'):
+                        os.remove(os.path.join(self.directory, filename))
+
+    def stats(self):
+        return {
+            'entries': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+    def _expired(self, stored_at):
+        return self.ttl is not None and time.time() - stored_at > self.ttl
+
+    def _remember(self, key, entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _load(self, key):
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if self._expired(data['storedAt']):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        return data['storedAt'], data['solution']
+
+    def _save(self, key, entry):
+        # Write to a temporary file first so readers never see a partial one
+        path = self._path(key)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, 'w') as f:
+                json.dump({'storedAt': entry[0], 'solution': entry[1]}, f)
+            os.replace(temp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Error caching solution: {str(e)}")
@@ -0,0 +1,212 @@
+import numpy as np
+
+# Constructive heuristics that build complete tours quickly. Tours are lists
+# of point indices into a DistanceMatrix, starting and ending at the depot.
+# They seed the solvers with good, varied starting tours (see initial_tours).
+
+def nearest_neighbor_tour(distance_matrix, start=0):
+    """Tour that always moves on to the closest unvisited point."""
+    n = len(distance_matrix)
+    matrix = distance_matrix.matrix
+    visited = np.zeros(n, dtype=bool)
+    visited[start] = True
+    
+    tour = [start]
+    current = start
+    for _ in range(n - 1):
+        current = int(np.argmin(np.where(visited, np.inf, matrix[current])))
+        visited[current] = True
+        tour.append(current)
+    
+    tour.append(start)
+    return tour
+
+def _from_depot(cycle, depot=0):
+    """Cyclic ``cycle`` rotated to start at ``depot``, closed again at the depot."""
+    start = cycle.index(depot)
+    return cycle[start:] + cycle[:start] + [depot]
+
+def randomized_nearest_neighbor_tour(distance_matrix, candidates=3, greediness=0.9):
+    """Nearest-neighbor tour from a random point that sometimes takes a detour.
+    
+    Each step moves to the closest unvisited point with probability
+    ``greediness`` and otherwise to one of the ``candidates`` closest.
+    """
+    n = len(distance_matrix)
+    matrix = distance_matrix.matrix
+    current = int(np.random.randint(n))
+    visited = np.zeros(n, dtype=bool)
+    visited[current] = True
+    
+    cycle = [current]
+    for remaining in range(n - 1, 0, -1):
+        row = np.where(visited, np.inf, matrix[current])
+        if np.random.random() < greediness:
+            current = int(np.argmin(row))
+        else:
+            k = min(candidates, remaining)
+            current = int(np.argpartition(row, k - 1)[np.random.randint(k)])
+        visited[current] = True
+        cycle.append(current)
+    return _from_depot(cycle)
+
+def greedy_edge_tour(distance_matrix, num_neighbors=10):
+    """Tour built from the shortest edges first (greedy matching heuristic).
+    
+    Edges to each point's ``num_neighbors`` nearest neighbors are added in
+    order of length unless they would give a point three edges or close a
+    cycle early; the resulting paths are then chained, each joined to the
+    nearest free end of another.
+    """
+    n = len(distance_matrix)
+    if n < 3:
+        return list(range(n)) + [0]
+    d = distance_matrix.rows
+    edges = sorted({(d[i][j], min(i, j), max(i, j))
+                    for i, row in enumerate(distance_matrix.neighbors(num_neighbors)) for j in row})
+    
+    parent = list(range(n))
+    
+    def find(city):
+        while parent[city] != city:
+            parent[city] = parent[parent[city]]
+            city = parent[city]
+        return city
+    
+    adjacent = [[] for _ in range(n)]
+    for _, i, j in edges:
+        if len(adjacent[i]) < 2 and len(adjacent[j]) < 2 and find(i) != find(j):
+            adjacent[i].append(j)
+            adjacent[j].append(i)
+            parent[find(i)] = find(j)
+    
+    # Paths from one free end to the other (single points are paths too)
+    seen = [False] * n
+    paths = []
+    for city in range(n):
+        if seen[city] or len(adjacent[city]) == 2:
+            continue
+        path = [city]
+        seen[city] = True
+        while True:
+            following = [c for c in adjacent[path[-1]] if not seen[c]]
+            if not following:
+                break
+            seen[following[0]] = True
+            path.append(following[0])
+        paths.append(path)
+    
+    # Chain the paths: from the current end, continue at the nearest free end
+    cycle = paths.pop()
+    while paths:
+        end = cycle[-1]
+        _, k, reverse = min((d[end][path[-1] if reverse else path[0]], k, reverse)
+                            for k, path in enumerate(paths) for reverse in (False, True))
+        path = paths.pop(k)
+        cycle += path[::-1] if reverse else path
+    return _from_depot(cycle)
+
+def christofides_tour(distance_matrix):
+    """Christofides-style tour with a greedy instead of an optimal matching.
+    
+    A minimum spanning tree is made Eulerian by pairing its odd-degree
+    points, shortest pairs first, and the Euler tour is shortcut past
+    repeated points.
+    """
+    n = len(distance_matrix)
+    if n < 3:
+        return list(range(n)) + [0]
+    matrix = distance_matrix.matrix
+    
+    # Prim's algorithm on the full matrix
+    edges = []
+    in_tree = np.zeros(n, dtype=bool)
+    in_tree[0] = True
+    closest = matrix[0].copy()
+    parent = np.zeros(n, dtype=np.intp)
+    for _ in range(n - 1):
+        city = int(np.argmin(np.where(in_tree, np.inf, closest)))
+        in_tree[city] = True
+        edges.append((int(parent[city]), city))
+        closer = matrix[city] < closest
+        closest = np.where(closer, matrix[city], closest)
+        parent = np.where(closer, city, parent)
+    
+    # Greedy matching of the odd-degree points
+    degree = np.bincount(np.array(edges).ravel(), minlength=n)
+    odd = np.flatnonzero(degree % 2)
+    rows, cols = np.triu_indices(len(odd), 1)
+    matched = np.zeros(n, dtype=bool)
+    for pair in np.argsort(matrix[odd[rows], odd[cols]], kind='stable'):
+        a, b = int(odd[rows[pair]]), int(odd[cols[pair]])
+        if not matched[a] and not matched[b]:
+            matched[a] = matched[b] = True
+            edges.append((a, b))
+    
+    # Euler tour (Hierholzer), keeping the first visit of every point
+    adjacent = [[] for _ in range(n)]
+    for e, (a, b) in enumerate(edges):
+        adjacent[a].append((b, e))
+        adjacent[b].append((a, e))
+    used = [False] * len(edges)
+    next_edge = [0] * n
+    stack = [0]
+    circuit = []
+    while stack:
+        city = stack[-1]
+        while next_edge[city] < len(adjacent[city]) and used[adjacent[city][next_edge[city]][1]]:
+            next_edge[city] += 1
+        if next_edge[city] == len(adjacent[city]):
+            circuit.append(stack.pop())
+        else:
+            other, e = adjacent[city][next_edge[city]]
+            used[e] = True
+            stack.append(other)
+    
+    seen = [False] * n
+    tour = []
+    for city in reversed(circuit):
+        if not seen[city]:
+            seen[city] = True
+            tour.append(city)
+    return tour + [0]
+
+def space_filling_curve_tour(points, order=16):
+    """Tour visiting ``points`` (dicts with 'lat' and 'lng') in Hilbert curve order."""
+    coords = np.array([[p['lat'], p['lng']] for p in points], dtype=float).reshape(-1, 2)
+    side = 1 << order
+    low = coords.min(axis=0)
+    span = np.maximum(coords.max(axis=0) - low, 1e-12)
+    cells = ((coords - low) / span * (side - 1)).astype(np.int64)
+    x, y = cells[:, 0], cells[:, 1]
+    
+    index = np.zeros(len(coords), dtype=np.int64)
+    s = side // 2
+    while s > 0:
+        rx = (x & s) > 0
+        ry = (y & s) > 0
+        index += s * s * ((3 * rx) ^ ry)
+        # Rotate the quadrant so the curve stays continuous
+        flip = ~ry & rx
+        x = np.where(flip, side - 1 - x, x)
+        y = np.where(flip, side - 1 - y, y)
+        x, y = np.where(ry, x, y), np.where(ry, y, x)
+        s //= 2
+    return _from_depot(np.argsort(index, kind='stable').tolist())
+
+def initial_tours(distance_matrix, count, points=None):
+    """``count`` good and varied tours for seeding a solver.
+    
+    The greedy edge, Christofides-style, space-filling curve (only with
+    ``points`` to take coordinates from) and nearest-neighbor tours come
+    first; the rest are randomized nearest-neighbor tours.
+    """
+    builders = [greedy_edge_tour, christofides_tour]
+    if points is not None:
+        builders.append(lambda _: space_filling_curve_tour(points))
+    builders.append(nearest_neighbor_tour)
+    
+    tours = [build(distance_matrix) for build in builders[:count]]
+    while len(tours) < count:
+        tours.append(randomized_nearest_neighbor_tour(distance_matrix))
+    return tours
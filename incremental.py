@@ -0,0 +1,182 @@
+import numpy as np
+
+from smo_aco import DistanceMatrix
+from local_search import two_opt
+
+# Incremental editing of existing mTSP routes as stops come and go during
+# the day. An edit only touches the routes it affects: a new stop goes where
+# it lengthens the routes the least, and every changed route is repaired
+# with 2-opt started from the stops around the edit, instead of re-running
+# cluster_and_route over everything.
+
+def _distances(coords, point):
+    """Distances in km from each row of ``coords`` to ``point``."""
+    return np.sqrt(((coords - point) ** 2).sum(axis=1)) * 111.32  # Convert to km
+
+def _leg_lengths(coords):
+    """Distances in km between consecutive rows of ``coords``."""
+    return _distances(coords[1:], coords[:-1])
+
+class RouteEditor:
+    """Existing routes over a depot and locations, edited stop by stop.
+    
+    ``routes`` are lists of indices into ``[depot] + locations`` starting and
+    ending at the depot (0), or dicts with a 'route' as returned by
+    ``solve_mtsp``. Stops keep their index while edits are applied; removed
+    locations are only dropped, and the others renumbered, by ``solution``.
+    With ``objective`` set to ``'minmax'`` new stops go where they keep the
+    longest route shortest rather than where they add the least distance.
+    """
+    
+    def __init__(self, depot, locations, routes, objective='total'):
+        self.points = [depot] + list(locations)
+        self.coords = np.array([[p['lat'], p['lng']] for p in self.points], dtype=float).reshape(-1, 2)
+        self.removed = set()
+        self.objective = objective
+        self.routes = []
+        for route in routes:
+            if isinstance(route, dict):
+                route = route['route']
+            route = [int(stop) for stop in route]
+            self.routes.append(route if len(route) >= 2 else [0, 0])
+        if not self.routes:
+            self.routes.append([0, 0])
+        self.lengths = [self.route_length(route) for route in self.routes]
+    
+    def route_length(self, route):
+        return float(_leg_lengths(self.coords[route]).sum())
+    
+    def find(self, stop):
+        """Index of the route visiting ``stop``."""
+        for k, route in enumerate(self.routes):
+            if stop in route[1:-1]:
+                return k
+        raise ValueError(f"Stop {stop} is not on any route")
+    
+    def insert(self, location, salesman=None):
+        """Add a new stop at its cheapest position and return its index.
+        
+        With ``salesman`` (1-based) the stop is added to that route only.
+        """
+        candidates = self._salesman_routes(salesman)
+        stop = len(self.points)
+        self.points.append(location)
+        self.coords = np.vstack([self.coords, [location['lat'], location['lng']]])
+        self._place(stop, candidates)
+        return stop
+    
+    def remove(self, stop):
+        """Take a stop off its route."""
+        k = self.find(stop)
+        route = self.routes[k]
+        position = route.index(stop, 1)
+        # The stops on either side of the gap are where 2-opt should look
+        active = [route[position - 1], route[position + 1]]
+        del route[position]
+        self.removed.add(stop)
+        self._repair(k, active)
+    
+    def move(self, stop, location, salesman=None):
+        """Give a stop new coordinates and re-insert it at its cheapest position."""
+        candidates = self._salesman_routes(salesman)
+        k = self.find(stop)
+        route = self.routes[k]
+        position = route.index(stop, 1)
+        active = [route[position - 1], route[position + 1]]
+        del route[position]
+        self._repair(k, active)
+        
+        self.points[stop] = location
+        self.coords[stop] = [location['lat'], location['lng']]
+        self._place(stop, candidates)
+    
+    def apply(self, operations):
+        """Apply a list of operations given as dicts (see ``update_routes``)."""
+        for operation in operations:
+            kind = operation['op']
+            if kind == 'insert':
+                self.insert(operation['location'], operation.get('salesman'))
+            elif kind == 'remove':
+                self.remove(operation['stop'])
+            elif kind == 'move':
+                self.move(operation['stop'], operation['location'], operation.get('salesman'))
+            else:
+                raise ValueError(f"Unknown operation: {kind}")
+    
+    def solution(self):
+        """The current locations and routes, renumbered without removed stops."""
+        kept = [i for i in range(1, len(self.points)) if i not in self.removed]
+        renumber = {0: 0}
+        renumber.update((old, new) for new, old in enumerate(kept, start=1))
+        routes = [{'salesman': k + 1, 'route': [renumber[stop] for stop in route]}
+                  for k, route in enumerate(self.routes)]
+        return {
+            'locations': [self.points[i] for i in kept],
+            'routes': routes,
+            'totalDistance': sum(self.lengths)
+        }
+    
+    def _salesman_routes(self, salesman):
+        """Routes a stop may go to: that of the 1-based ``salesman``, or all (None)."""
+        if salesman is None:
+            return None
+        if not isinstance(salesman, int) or not 1 <= salesman <= len(self.routes):
+            raise ValueError(f"Salesman must be between 1 and {len(self.routes)}, got {salesman!r}")
+        return [salesman - 1]
+    
+    def _place(self, stop, candidates=None):
+        """Cheapest insertion of ``stop`` into one of the ``candidates`` routes (all by default)."""
+        point = self.coords[stop]
+        best = None
+        for k in (range(len(self.routes)) if candidates is None else candidates):
+            coords = self.coords[self.routes[k]]
+            to_stop = _distances(coords, point)
+            added = to_stop[:-1] + to_stop[1:] - _leg_lengths(coords)
+            position = int(np.argmin(added))
+            cost = float(added[position])
+            if self.objective == 'minmax':
+                others = max((length for j, length in enumerate(self.lengths) if j != k), default=0.0)
+                score = (max(others, self.lengths[k] + cost), cost)
+            else:
+                score = (cost,)
+            if best is None or score < best[0]:
+                best = (score, k, position + 1)
+        
+        _, k, position = best
+        self.routes[k].insert(position, stop)
+        self._repair(k, [stop])
+    
+    def _repair(self, k, active):
+        """Re-optimize route ``k`` with 2-opt around the ``active`` stops."""
+        route = self.routes[k]
+        if len(route) < 5:
+            self.lengths[k] = self.route_length(route)
+            return
+        
+        # Solve on the route's own points only, so the cost does not grow
+        # with the number of stops on other routes
+        stops = route[:-1]
+        local = {stop: i for i, stop in enumerate(stops)}
+        distance_matrix = DistanceMatrix([self.points[stop] for stop in stops])
+        improved, length = two_opt(list(range(len(stops))) + [0], distance_matrix,
+                                   active=[local[stop] for stop in active if stop in local])
+        self.routes[k] = [stops[i] for i in improved]
+        self.lengths[k] = length
+
+def update_routes(depot, locations, routes, operations, objective='total'):
+    """Apply stop edits to existing routes.
+    
+    ``operations`` is a list of dicts, applied in order:
+    
+    - ``{'op': 'insert', 'location': {lat, lng}}`` adds a stop;
+    - ``{'op': 'remove', 'stop': i}`` drops stop ``i``;
+    - ``{'op': 'move', 'stop': i, 'location': {lat, lng}}`` relocates stop ``i``.
+    
+    Inserts and moves accept an optional 1-based 'salesman' to pin the stop
+    to that route. Stops are numbered as in ``[depot] + locations`` and
+    inserted ones continue after the last location. Returns the updated
+    locations, routes and total distance.
+    """
+    editor = RouteEditor(depot, locations, routes, objective)
+    editor.apply(operations)
+    return editor.solution()
@@ -0,0 +1,151 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Optional instrumentation of the solvers. While a Profile is active, the
+# solvers add the time spent in each phase, count events such as fitness
+# evaluations or 2-opt moves, and record every improved incumbent as a
+# convergence trace. With no active profile every hook is a cheap no-op.
+# Profiles of worker processes are sent back as dicts and merged.
+
+_local = threading.local()
+
+def current():
+    """The profile active in this thread, or None."""
+    return getattr(_local, 'profile', None)
+
+@contextmanager
+def phase(name):
+    """Add the time spent in the block to phase ``name`` of the active profile."""
+    profile = current()
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add_time(name, time.perf_counter() - start)
+
+def count(name, amount=1):
+    """Add ``amount`` to counter ``name`` of the active profile."""
+    profile = current()
+    if profile is not None:
+        profile.counters[name] = profile.counters.get(name, 0) + amount
+
+def traced(callback, solver):
+    """``callback`` wrapped to also record incumbents in the active profile's trace."""
+    profile = current()
+    if profile is None:
+        return callback
+    run = profile.runs
+    profile.runs += 1
+    
+    def record(incumbent):
+        profile.trace.append({
+            'run': run,
+            'solver': solver,
+            'iteration': incumbent['iteration'],
+            'elapsed': incumbent['elapsed'],
+            'fitness': incumbent['fitness']
+        })
+        if callback:
+            callback(incumbent)
+    return record
+
+class Profile:
+    """Phase timers, event counters and a convergence trace for one solve.
+    
+    ``timers`` maps phase names to seconds and ``calls`` to how often they
+    ran; ``trace`` holds one entry per improved incumbent, tagged with the
+    solver run (one per cluster) it came from.
+    """
+    def __init__(self):
+        self.timers = {}
+        self.calls = {}
+        self.counters = {}
+        self.trace = []
+        self.runs = 0
+    
+    @contextmanager
+    def activate(self):
+        """Make this the active profile of the current thread within the block."""
+        previous = current()
+        _local.profile = self
+        try:
+            yield self
+        finally:
+            _local.profile = previous
+    
+    def add_time(self, name, seconds):
+        self.timers[name] = self.timers.get(name, 0.0) + seconds
+        self.calls[name] = self.calls.get(name, 0) + 1
+    
+    def merge(self, data):
+        """Add a profile given as a dict (see ``to_dict``), e.g. from a worker process."""
+        for name, seconds in data['timers'].items():
+            self.timers[name] = self.timers.get(name, 0.0) + seconds
+        for name, calls in data['calls'].items():
+            self.calls[name] = self.calls.get(name, 0) + calls
+        for name, amount in data['counters'].items():
+            self.counters[name] = self.counters.get(name, 0) + amount
+        self.trace.extend(dict(entry, run=entry['run'] + self.runs) for entry in data['trace'])
+        self.runs += data['runs']
+    
+    def to_dict(self):
+        return {
+            'timers': dict(self.timers),
+            'calls': dict(self.calls),
+            'counters': dict(self.counters),
+            'trace': list(self.trace),
+            'runs': self.runs
+        }
+
+class MetricsRegistry:
+    """Totals over all profiled solves, exported in the Prometheus text format."""
+    def __init__(self, prefix='mtsp'):
+        self.prefix = prefix
+        self.totals = Profile()
+        self.solves = {}  # algorithm -> [count, seconds]
+        self.lock = threading.Lock()
+    
+    def add(self, algorithm, seconds, profile):
+        """Record one solve of ``algorithm`` and its profile dict."""
+        with self.lock:
+            solves = self.solves.setdefault(algorithm, [0, 0.0])
+            solves[0] += 1
+            solves[1] += seconds
+            self.totals.merge(dict(profile, trace=[]))
+    
+    def to_prometheus(self):
+        p = self.prefix
+        with self.lock:
+            lines = [
+                f'# HELP {p}_solves_total Completed solves.',
+                f'# TYPE {p}_solves_total counter'
+            ]
+            lines += [f'{p}_solves_total{{algorithm="{a}"}} {n}' for a, (n, _) in sorted(self.solves.items())]
+            lines += [
+                f'# HELP {p}_solve_seconds_total Wall-clock time spent solving.',
+                f'# TYPE {p}_solve_seconds_total counter'
+            ]
+            lines += [f'{p}_solve_seconds_total{{algorithm="{a}"}} {s}' for a, (_, s) in sorted(self.solves.items())]
+            lines += [
+                f'# HELP {p}_phase_seconds_total Time spent in each solver phase.',
+                f'# TYPE {p}_phase_seconds_total counter'
+            ]
+            lines += [f'{p}_phase_seconds_total{{phase="{name}"}} {seconds}'
+                      for name, seconds in sorted(self.totals.timers.items())]
+            lines += [
+                f'# HELP {p}_phase_calls_total Times each solver phase ran.',
+                f'# TYPE {p}_phase_calls_total counter'
+            ]
+            lines += [f'{p}_phase_calls_total{{phase="{name}"}} {calls}'
+                      for name, calls in sorted(self.totals.calls.items())]
+            lines += [
+                f'# HELP {p}_events_total Solver events such as fitness evaluations and 2-opt moves.',
+                f'# TYPE {p}_events_total counter'
+            ]
+            lines += [f'{p}_events_total{{event="{name}"}} {amount}'
+                      for name, amount in sorted(self.totals.counters.items())]
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,240 @@
+import multiprocessing
+import os
+import signal
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from smo_aco import solve_mtsp
+
+# Background execution of mTSP solves. Each job runs solve_mtsp in its own
+# child process, leading its own process group, so a running solve can be
+# cancelled by terminating the group (with any pool workers of the solve),
+# and a bounded pool of threads limits how many solves run at once. Improved
+# intermediate solutions are relayed from the child as they are found.
+
+# Minimum seconds between intermediate solutions sent by a solving process
+INCUMBENT_INTERVAL = 0.1
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+class Job:
+    def __init__(self, params):
+        self.id = uuid.uuid4().hex
+        self.params = params
+        self.status = 'queued'  # queued, running, done, failed or cancelled
+        self.result = None
+        self.error = None
+        self.incumbent = None  # Latest improved intermediate solution
+        self.updates = 0  # Number of incumbents received so far
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.future = None
+        self.process = None
+    
+    @property
+    def finished(self):
+        return self.status in ('done', 'failed', 'cancelled')
+    
+    def to_dict(self, include_result=True):
+        """Job status as a JSON-serializable dict."""
+        data = {
+            'jobId': self.id,
+            'status': self.status,
+            'submittedAt': self.submitted_at,
+            'startedAt': self.started_at,
+            'finishedAt': self.finished_at
+        }
+        if self.error is not None:
+            data['error'] = self.error
+        if include_result and self.result is not None:
+            data['result'] = self.result
+        elif include_result and self.incumbent is not None:
+            data['incumbent'] = self.incumbent
+        return data
+
+class JobQueue:
+    """Runs solves in the background on at most ``max_workers`` at a time.
+    
+    At most ``max_pending`` jobs may wait for a worker; finished jobs are
+    kept for ``retention`` seconds so clients can fetch their results.
+    """
+    def __init__(self, max_workers=2, max_pending=100, retention=3600):
+        self.max_pending = max_pending
+        self.retention = retention
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+    
+    def submit(self, params):
+        """Queue a solve with keyword arguments for solve_mtsp and return its Job."""
+        with self.lock:
+            self._purge()
+            pending = sum(1 for job in self.jobs.values() if job.status == 'queued')
+            if pending >= self.max_pending:
+                raise QueueFullError(f'Too many queued jobs ({pending})')
+            job = Job(params)
+            self.jobs[job.id] = job
+            job.future = self.executor.submit(self._run, job)
+        return job
+    
+    def get(self, job_id):
+        """The job with this id, or None."""
+        with self.lock:
+            return self.jobs.get(job_id)
+    
+    def list(self):
+        """All known jobs, oldest first."""
+        with self.lock:
+            return list(self.jobs.values())
+    
+    def wait(self, job_id, timeout):
+        """Block until the job finishes or ``timeout`` seconds pass; returns the job."""
+        deadline = time.time() + timeout
+        with self.changed:
+            job = self.jobs.get(job_id)
+            while job is not None and not job.finished:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self.changed.wait(remaining)
+        return job
+    
+    def updates(self, job_id, heartbeat=15):
+        """Yield ``(event, data)`` for a job as things happen.
+        
+        Every new incumbent is yielded as ``('incumbent', solution)`` and the
+        final state as ``(status, job dict)``, after which the generator
+        ends. ``(None, None)`` is yielded when nothing happened for
+        ``heartbeat`` seconds, so callers can keep connections alive.
+        """
+        seen = 0
+        while True:
+            timed_out = False
+            with self.changed:
+                job = self.jobs.get(job_id)
+                if job is None:
+                    return
+                if job.updates == seen and not job.finished:
+                    timed_out = not self.changed.wait(heartbeat)
+                updates, incumbent, finished = job.updates, job.incumbent, job.finished
+            
+            if updates != seen:
+                seen = updates
+                yield 'incumbent', incumbent
+            if finished:
+                yield job.status, job.to_dict()
+                return
+            if timed_out:
+                yield None, None
+    
+    def cancel(self, job_id):
+        """Cancel a queued or running job. Returns False if it already finished."""
+        with self.changed:
+            job = self.jobs.get(job_id)
+            if job is None or job.finished:
+                return False
+            if job.status == 'queued':
+                job.future.cancel()
+            elif job.process is not None:
+                _terminate_tree(job.process)
+            self._finish(job, 'cancelled')
+            return True
+    
+    def _run(self, job):
+        """Execute a job in a child process and record its outcome."""
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        with self.changed:
+            if job.finished:
+                return
+            process = multiprocessing.Process(target=_solve_in_process, args=(sender, job.params))
+            process.start()
+            job.process = process
+            job.status = 'running'
+            job.started_at = time.time()
+            self.changed.notify_all()
+        sender.close()
+        
+        try:
+            while True:
+                outcome, payload = receiver.recv()
+                if outcome != 'incumbent':
+                    break
+                with self.changed:
+                    job.incumbent = payload
+                    job.updates += 1
+                    self.changed.notify_all()
+        except EOFError:
+            outcome, payload = 'failed', 'Solver process exited unexpectedly'
+        finally:
+            receiver.close()
+            # job.process is cleared when the job is cancelled meanwhile
+            process.join()
+        
+        with self.changed:
+            # A cancelled job's process is terminated, which lands here too
+            if job.finished:
+                return
+            if outcome == 'done':
+                job.result = payload
+            else:
+                job.error = payload
+            self._finish(job, outcome)
+    
+    def _finish(self, job, status):
+        job.status = status
+        job.finished_at = time.time()
+        job.process = None
+        self.changed.notify_all()
+    
+    def _purge(self):
+        """Forget finished jobs older than the retention period."""
+        cutoff = time.time() - self.retention
+        for job_id in [job_id for job_id, job in self.jobs.items()
+                       if job.finished and job.finished_at < cutoff]:
+            del self.jobs[job_id]
+
+def _terminate_tree(process):
+    """Terminate a job's process together with the processes it started."""
+    if hasattr(os, 'killpg'):
+        try:
+            os.killpg(process.pid, signal.SIGTERM)
+            return
+        except (ProcessLookupError, PermissionError):
+            pass  # Not yet leading its own group
+    process.terminate()
+
+def _solve_in_process(conn, params):
+    """Child process entry point: send ('incumbent', solution) for improvements
+    as they are found, then ('done', solution) or ('failed', message)."""
+    if hasattr(os, 'setsid'):
+        os.setsid()  # Own process group, so cancelling reaches pool workers too
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        # Pool workers then start from a clean server rather than as forks of
+        # this process, so they do not hold the result pipe open
+        multiprocessing.set_start_method('forkserver', force=True)
+    last_sent = None
+    
+    def send_incumbent(incumbent):
+        nonlocal last_sent
+        now = time.time()
+        if last_sent is not None and now - last_sent < INCUMBENT_INTERVAL:
+            return
+        last_sent = now
+        incumbent['computationTime'] = incumbent['elapsed'] * 1000  # Convert to milliseconds
+        conn.send(('incumbent', incumbent))
+    
+    try:
+        start_time = time.time()
+        solution = solve_mtsp(callback=send_incumbent, **params)
+        solution['computationTime'] = (time.time() - start_time) * 1000  # Convert to milliseconds
+        conn.send(('done', solution))
+    except Exception as e:
+        conn.send(('failed', str(e)))
+    finally:
+        conn.close()
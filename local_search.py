@@ -0,0 +1,610 @@
+from collections import deque
+
+import instrumentation
+
+# Local search operators for closed routes that start and end at the depot.
+# Routes are lists of point indices into a shared DistanceMatrix.
+
+def _reverse(tour, pos, i, j):
+    """Reverse the cyclic segment tour[i..j] in place, keeping ``pos`` in sync.
+
+    If the segment covers more than half of the tour the complementary segment
+    is reversed instead, which yields the same cyclic tour traversed the other
+    way round (distances are symmetric).
+    """
+    n = len(tour)
+    length = (j - i) % n + 1
+    if 2 * length > n:
+        i, j = (j + 1) % n, (i - 1) % n
+        length = n - length
+    for _ in range(length // 2):
+        ci, cj = tour[i], tour[j]
+        tour[i] = cj
+        pos[cj] = i
+        tour[j] = ci
+        pos[ci] = j
+        i = (i + 1) % n
+        j = (j - 1) % n
+
+def two_opt(route, distance_matrix, num_neighbors=10, max_moves=None, active=None):
+    """Improve a closed route with 2-opt.
+
+    Moves are evaluated by edge delta in O(1), candidates are restricted to
+    the ``num_neighbors`` nearest neighbors of each city, cities whose
+    neighborhood has not changed are skipped (don't-look bits) and improving
+    moves reverse the tour segment in place. With ``active`` given, only
+    those cities start with their don't-look bit off, which confines the
+    search to the neighborhood of a local edit.
+
+    Returns the improved route (depot first and last) and its length.
+    """
+    depot = route[0]
+    tour = list(route[:-1])
+    n = len(tour)
+    if n < 4:
+        return list(route), distance_matrix.route_length(route)
+    
+    d = distance_matrix.rows
+    neighbors = distance_matrix.neighbors(num_neighbors)
+    pos = _positions(tour, len(distance_matrix))
+    
+    # Queue of cities whose don't-look bit is off
+    queue = deque(city for city in (tour if active is None else active) if pos[city] >= 0)
+    queued = [False] * len(distance_matrix)
+    for city in queue:
+        queued[city] = True
+    
+    moves = 0
+    tried = 0
+    while queue and (max_moves is None or moves < max_moves):
+        a = queue.popleft()
+        queued[a] = False
+        improved = False
+        
+        for forward in (True, False):
+            i = pos[a]
+            b = tour[(i + 1) % n] if forward else tour[i - 1]
+            d_ab = d[a][b]
+            
+            for c in neighbors[a]:
+                d_ac = d[a][c]
+                # Neighbor lists are sorted, so no later candidate can gain
+                if d_ac >= d_ab:
+                    break
+                j = pos[c]
+                if j < 0 or c == b:
+                    continue
+                e = tour[(j + 1) % n] if forward else tour[j - 1]
+                if e == a:
+                    continue
+                
+                delta = d_ac + d[b][e] - d_ab - d[c][e]
+                tried += 1
+                if delta < -1e-10:
+                    if forward:
+                        # a b ... c e  ->  a c ... b e
+                        _reverse(tour, pos, pos[b], j)
+                    else:
+                        # b a ... e c  ->  b e ... a c
+                        _reverse(tour, pos, i, pos[e])
+                    moves += 1
+                    for city in (a, b, c, e):
+                        if not queued[city]:
+                            queued[city] = True
+                            queue.append(city)
+                    improved = True
+                    break
+            
+            if improved:
+                break
+    
+    instrumentation.count('two_opt.moves_tried', tried)
+    instrumentation.count('two_opt.moves_applied', moves)
+    
+    return _closed_route(tour, pos, depot, distance_matrix)
+
+def _closed_route(tour, pos, depot, distance_matrix):
+    """Rotate a cyclic tour so it starts and ends at the depot again; returns it and its length."""
+    start = pos[depot]
+    route = tour[start:] + tour[:start] + [depot]
+    return route, distance_matrix.route_length(route)
+
+def _positions(tour, size):
+    """Position of every city of ``tour`` in it, -1 for cities not on it."""
+    pos = [-1] * size
+    for i, city in enumerate(tour):
+        pos[city] = i
+    return pos
+
+def or_opt(route, distance_matrix, num_neighbors=10, max_segment=3, max_moves=None, active=None):
+    """Improve a closed route with Or-opt segment moves.
+
+    Segments of 1 to ``max_segment`` consecutive cities are moved, forwards
+    or reversed, between two adjacent cities elsewhere on the route. Moves
+    are evaluated by edge delta, only edges next to the ``num_neighbors``
+    nearest neighbors of a segment end are tried as insertion points, and
+    don't-look bits (``active`` as in ``two_opt``) skip unchanged cities.
+
+    Returns the improved route (depot first and last) and its length.
+    """
+    depot = route[0]
+    tour = list(route[:-1])
+    n = len(tour)
+    if n < 5:
+        return list(route), distance_matrix.route_length(route)
+    
+    d = distance_matrix.rows
+    neighbors = distance_matrix.neighbors(num_neighbors)
+    pos = _positions(tour, len(distance_matrix))
+    
+    queue = deque(city for city in (tour if active is None else active) if pos[city] >= 0)
+    queued = [False] * len(distance_matrix)
+    for city in queue:
+        queued[city] = True
+    
+    moves = 0
+    tried = 0
+    while queue and (max_moves is None or moves < max_moves):
+        a = queue.popleft()
+        queued[a] = False
+        move = None
+        
+        # Segments starting at a, in tour order
+        for length in range(1, min(max_segment, n - 3) + 1):
+            i = pos[a]
+            segment = [tour[(i + k) % n] for k in range(length)]
+            first, last = segment[0], segment[-1]
+            p = tour[i - 1]
+            nx = tour[(i + length) % n]
+            removal_gain = d[p][first] + d[last][nx] - d[p][nx]
+            if removal_gain <= 1e-10:
+                continue
+            
+            inside = set(segment)
+            for end in (first, last):
+                for c in neighbors[end]:
+                    # Neighbor lists are sorted, so no later candidate can gain
+                    if d[end][c] >= removal_gain:
+                        break
+                    j = pos[c]
+                    if j < 0 or c in inside:
+                        continue
+                    # Insert between c and the city after or before it
+                    for u, v in ((c, tour[(j + 1) % n]), (tour[j - 1], c)):
+                        if u in inside or v in inside:
+                            continue
+                        forward = d[u][first] + d[last][v]
+                        backward = d[u][last] + d[first][v]
+                        tried += 1
+                        delta = min(forward, backward) - d[u][v] - removal_gain
+                        if delta < -1e-10:
+                            move = (segment, u, backward < forward)
+                            break
+                    if move:
+                        break
+                if move:
+                    break
+            if move:
+                break
+        
+        if move:
+            segment, u, reverse = move
+            touched = [tour[pos[segment[0]] - 1], tour[(pos[segment[-1]] + 1) % n], u,
+                       tour[(pos[u] + 1) % n], segment[0], segment[-1]]
+            # Rebuild the tour from the city after the segment round to u
+            start = (pos[segment[-1]] + 1) % n
+            rest = [tour[(start + k) % n] for k in range(n - len(segment))]
+            k = rest.index(u)
+            tour = rest[:k + 1] + (segment[::-1] if reverse else segment) + rest[k + 1:]
+            for idx, city in enumerate(tour):
+                pos[city] = idx
+            moves += 1
+            for city in touched:
+                if not queued[city]:
+                    queued[city] = True
+                    queue.append(city)
+    
+    instrumentation.count('or_opt.moves_tried', tried)
+    instrumentation.count('or_opt.moves_applied', moves)
+    
+    return _closed_route(tour, pos, depot, distance_matrix)
+
+def swap(route, distance_matrix, num_neighbors=10, max_moves=None, active=None):
+    """Improve a closed route by exchanging the positions of two cities.
+
+    Each city is only swapped with its ``num_neighbors`` nearest neighbors,
+    moves are evaluated by edge delta and don't-look bits (``active`` as in
+    ``two_opt``) skip unchanged cities.
+
+    Returns the improved route (depot first and last) and its length.
+    """
+    depot = route[0]
+    tour = list(route[:-1])
+    n = len(tour)
+    if n < 4:
+        return list(route), distance_matrix.route_length(route)
+    
+    d = distance_matrix.rows
+    neighbors = distance_matrix.neighbors(num_neighbors)
+    pos = _positions(tour, len(distance_matrix))
+    
+    queue = deque(city for city in (tour if active is None else active) if pos[city] >= 0)
+    queued = [False] * len(distance_matrix)
+    for city in queue:
+        queued[city] = True
+    
+    moves = 0
+    tried = 0
+    while queue and (max_moves is None or moves < max_moves):
+        a = queue.popleft()
+        queued[a] = False
+        
+        for c in neighbors[a]:
+            i, j = pos[a], pos[c]
+            if j < 0:
+                continue
+            pa, na = tour[i - 1], tour[(i + 1) % n]
+            pc, nc = tour[j - 1], tour[(j + 1) % n]
+            if na == c:
+                # pa a c nc  ->  pa c a nc
+                delta = d[pa][c] + d[a][nc] - d[pa][a] - d[c][nc]
+            elif pa == c:
+                # pc c a na  ->  pc a c na
+                delta = d[pc][a] + d[c][na] - d[pc][c] - d[a][na]
+            else:
+                delta = (d[pa][c] + d[c][na] + d[pc][a] + d[a][nc]
+                         - d[pa][a] - d[a][na] - d[pc][c] - d[c][nc])
+            tried += 1
+            if delta < -1e-10:
+                tour[i], tour[j] = c, a
+                pos[a], pos[c] = j, i
+                moves += 1
+                for city in (pa, na, pc, nc, a, c):
+                    if not queued[city]:
+                        queued[city] = True
+                        queue.append(city)
+                break
+    
+    instrumentation.count('swap.moves_tried', tried)
+    instrumentation.count('swap.moves_applied', moves)
+    
+    return _closed_route(tour, pos, depot, distance_matrix)
+
+def or_3opt(route, distance_matrix, num_neighbors=10, max_segment=3):
+    """Improve a closed route with 2-opt and Or-opt until neither finds a move.
+
+    Or-opt moves are the segment-insertion subset of 3-opt, so alternating
+    them with 2-opt reaches a local optimum of both at a fraction of the
+    cost of full 3-opt. After the first round only cities near the changes
+    are re-examined.
+
+    Returns the improved route (depot first and last) and its length.
+    """
+    route, length = two_opt(route, distance_matrix, num_neighbors)
+    active = None
+    while True:
+        improved, improved_length = or_opt(route, distance_matrix, num_neighbors, max_segment, active=active)
+        if improved_length >= length - 1e-10:
+            return route, length
+        changed = _changed_cities(route, improved)
+        route, length = two_opt(improved, distance_matrix, num_neighbors, active=changed)
+        active = changed + _changed_cities(improved, route)
+
+def _changed_cities(old, new):
+    """Cities with an edge in route ``new`` that route ``old`` does not have."""
+    edges = {frozenset(edge) for edge in zip(old, old[1:])}
+    return list({city for edge in zip(new, new[1:]) if frozenset(edge) not in edges for city in edge})
+
+def _lk_move(tour, pos, d, neighbors, t1, forward, max_depth, breadth):
+    """Apply the best variable-depth move that breaks the edge after ``t1``.
+
+    The edge from ``t1`` to its successor (its predecessor if not
+    ``forward``) is broken and the tour is rebuilt by a chain of 2-opt
+    reversals, each adding an edge from the current free end ``t2`` to one of
+    its nearest neighbors ``t3`` and breaking the edge from ``t3`` to ``t4``,
+    which leaves ``t4`` joined to ``t1``. The chain only grows while the
+    partial gain stays positive, never breaks an edge it added and stops
+    after ``max_depth`` steps; the ``breadth`` best first steps are tried,
+    later steps are chosen greedily. The chain is rolled back to its best
+    closed tour.
+
+    Returns the gain and the cities whose edges changed, or 0 and no cities.
+    """
+    n = len(tour)
+    
+    def next_to(city, fwd):
+        return tour[(pos[city] + (1 if fwd else -1)) % n]
+    
+    def steps(t2, gain, fwd, added):
+        """Candidate steps from free end ``t2``, best partial gain first."""
+        found = []
+        for t3 in neighbors[t2]:
+            g = gain - d[t2][t3]
+            if g <= 0:
+                break  # Neighbors are sorted, so no later one can help
+            if t3 == t1 or pos[t3] < 0:
+                continue
+            t4 = next_to(t3, not fwd)
+            if t4 == t2 or (min(t3, t4), max(t3, t4)) in added:
+                continue
+            found.append((g + d[t3][t4], t3, t4))
+        found.sort(reverse=True)
+        return found
+    
+    t2 = next_to(t1, forward)
+    for first_gain, t3, t4 in steps(t2, d[t1][t2], forward, ())[:breadth]:
+        applied = []
+        chain = [t1, t2]
+        added = set()
+        best_gain, best_steps = 0.0, 0
+        gain, fwd = first_gain, forward
+        while True:
+            # Reverse t2..t4: adds (t2, t3) and (t4, t1), breaks (t4, t3)
+            i, j = (pos[t2], pos[t4]) if fwd else (pos[t4], pos[t2])
+            _reverse(tour, pos, i, j)
+            applied.append((i, j))
+            chain += [t3, t4]
+            added.add((min(t2, t3), max(t2, t3)))
+            closed_gain = gain - d[t4][t1]
+            if closed_gain > best_gain + 1e-10:
+                best_gain, best_steps = closed_gain, len(applied)
+            if len(applied) >= max_depth:
+                break
+            
+            # Continue from t4, now the free end next to t1
+            t2 = t4
+            fwd = next_to(t1, True) == t2
+            found = steps(t2, gain, fwd, added)
+            if not found:
+                break
+            gain, t3, t4 = found[0]
+        
+        for i, j in reversed(applied[best_steps:]):
+            _reverse(tour, pos, i, j)
+        if best_steps:
+            return best_gain, chain[:2 * best_steps + 2]
+        t2 = next_to(t1, forward)
+    return 0.0, []
+
+def _lk_pass(route, distance_matrix, num_neighbors, max_depth, breadth, active):
+    """Apply ``_lk_move`` from every city until none improves.
+
+    Returns the improved route, its length and the cities whose edges changed.
+    """
+    depot = route[0]
+    tour = list(route[:-1])
+    n = len(tour)
+    if n < 5:
+        return list(route), distance_matrix.route_length(route), set()
+    
+    d = distance_matrix.rows
+    neighbors = distance_matrix.neighbors(num_neighbors)
+    pos = _positions(tour, len(distance_matrix))
+    
+    queue = deque(city for city in (tour if active is None else active) if pos[city] >= 0)
+    queued = [False] * len(distance_matrix)
+    for city in queue:
+        queued[city] = True
+    
+    moves = 0
+    touched = set()
+    while queue:
+        t1 = queue.popleft()
+        queued[t1] = False
+        for forward in (True, False):
+            gain, changed = _lk_move(tour, pos, d, neighbors, t1, forward, max_depth, breadth)
+            if gain > 0:
+                moves += 1
+                touched.update(changed)
+                for city in changed:
+                    if not queued[city]:
+                        queued[city] = True
+                        queue.append(city)
+                break
+    
+    instrumentation.count('lk.moves_applied', moves)
+    
+    route, length = _closed_route(tour, pos, depot, distance_matrix)
+    return route, length, touched
+
+def lin_kernighan(route, distance_matrix, num_neighbors=8, max_depth=10, breadth=3, max_segment=3, active=None):
+    """Improve a closed route with Lin-Kernighan style variable-depth moves.
+
+    Every city tries a chain of up to ``max_depth`` 2-opt reversals through
+    the ``num_neighbors`` nearest neighbors of the chain's free end (see
+    ``_lk_move``), breaking either of its two tour edges. Such chains find
+    improving 3-opt and deeper moves that plain 2-opt misses, at a cost close
+    to 2-opt's. Or-opt moves of up to ``max_segment`` cities (0 to skip them)
+    alternate with the chains until neither improves, and don't-look bits
+    (``active`` as in ``two_opt``) skip unchanged cities.
+
+    Returns the improved route (depot first and last) and its length.
+    """
+    route, length, touched = _lk_pass(route, distance_matrix, num_neighbors, max_depth, breadth, active)
+    if not max_segment:
+        return route, length
+    
+    active = None if active is None else list(touched.union(active))
+    while True:
+        improved, improved_length = or_opt(route, distance_matrix, num_neighbors, max_segment, active=active)
+        if improved_length >= length - 1e-10:
+            return route, length
+        changed = _changed_cities(route, improved)
+        route, length, touched = _lk_pass(improved, distance_matrix, num_neighbors, max_depth, breadth, changed)
+        active = list(touched.union(changed))
+
+# Inter-route operators. These move customers between the routes of
+# different salesmen, which all start and end at the shared depot (0), so a
+# poor cluster boundary can still be repaired after routing.
+
+# Segment lengths (moved from the first route, from the second) per operator
+SEGMENT_MOVES = {
+    'relocate': [(1, 0)],
+    'exchange': [(1, 1)],
+    'cross': [(la, lb) for la in (1, 2, 3) for lb in (1, 2, 3) if (la, lb) != (1, 1)]
+}
+
+def _link(d, x, segment, y):
+    """Length of the edges joining ``x`` to ``segment`` to ``y`` (or ``x`` to ``y``)."""
+    if not segment:
+        return d[x][y]
+    return d[x][segment[0]] + d[segment[-1]][y]
+
+def _inner(d, segment):
+    """Length of the path through ``segment``."""
+    return sum(d[u][v] for u, v in zip(segment, segment[1:]))
+
+def improve_routes(routes, distance_matrix, operators=('relocate', 'exchange', 'two_opt_star', 'cross'),
+                   num_neighbors=10, objective='total', capacity=None, max_moves=None):
+    """Improve a set of routes with moves between them.
+
+    ``routes`` index ``distance_matrix`` and start and end at the depot (0).
+    The operators are ``'relocate'`` (move a customer to another route),
+    ``'exchange'`` (swap two customers), ``'two_opt_star'`` (swap the route
+    tails after two customers) and ``'cross'`` (swap segments of up to three
+    customers). Candidates come from each customer's ``num_neighbors``
+    nearest neighbors on other routes, moves are evaluated by edge delta
+    and applied on first improvement, and don't-look bits skip customers
+    whose surroundings have not changed. Moves must shorten the total, or
+    with ``objective='minmax'`` the longer of the two routes involved, and
+    keep every route at or below ``capacity`` customers. Changed routes are
+    finally re-optimized with 2-opt.
+
+    Returns the new routes and their lengths.
+    """
+    d = distance_matrix.rows
+    neighbors = distance_matrix.neighbors(num_neighbors)
+    routes = [list(route) for route in routes]
+    lengths = [distance_matrix.route_length(route) for route in routes]
+    segment_moves = [move for name in operators for move in SEGMENT_MOVES.get(name, [])]
+    two_opt_star = 'two_opt_star' in operators
+    
+    route_of = [-1] * len(distance_matrix)
+    pos = [-1] * len(distance_matrix)
+    prefix = [None] * len(routes)  # Length of each route up to each position
+    
+    def index_route(k):
+        route = routes[k]
+        prefix[k] = [0.0]
+        for u, v in zip(route, route[1:]):
+            prefix[k].append(prefix[k][-1] + d[u][v])
+        for i, city in enumerate(route):
+            if 0 < i < len(route) - 1:
+                route_of[city] = k
+                pos[city] = i
+    
+    for k in range(len(routes)):
+        index_route(k)
+    
+    def accept(r, s, new_r, new_s):
+        """Whether routes r and s may become ``new_r`` and ``new_s`` long.
+        
+        For minmax the (longest route, total) score over all routes must drop.
+        """
+        if objective == 'minmax':
+            others = max((length for k, length in enumerate(lengths) if k != r and k != s), default=0.0)
+            old_max, new_max = max(others, lengths[r], lengths[s]), max(others, new_r, new_s)
+            if new_max < old_max - 1e-10:
+                return True
+            if new_max > old_max + 1e-10:
+                return False
+        return new_r + new_s < lengths[r] + lengths[s] - 1e-10
+    
+    def find_move(a):
+        """First improving move involving customer ``a``, as the two new routes."""
+        r = route_of[a]
+        route_r = routes[r]
+        i = pos[a]
+        for c in neighbors[a]:
+            s = route_of[c]
+            if s < 0 or s == r:
+                continue
+            route_s = routes[s]
+            j = pos[c]
+            
+            # Segment moves: a's segment goes next to c, c's segment takes its place
+            for la, lb in segment_moves:
+                if i + la > len(route_r) - 1:
+                    continue
+                if capacity is not None and len(route_s) - 2 - lb + la > capacity:
+                    continue
+                seg_a = route_r[i:i + la]
+                for start in (j, j + 1):
+                    if start + lb > len(route_s) - 1:
+                        continue
+                    if capacity is not None and len(route_r) - 2 - la + lb > capacity:
+                        continue
+                    seg_b = route_s[start:start + lb]
+                    pr, sr = route_r[i - 1], route_r[i + la]
+                    ps, ss = route_s[start - 1], route_s[start + lb]
+                    inner = _inner(d, seg_b) - _inner(d, seg_a)
+                    new_r = lengths[r] + _link(d, pr, seg_b, sr) - _link(d, pr, seg_a, sr) + inner
+                    new_s = lengths[s] + _link(d, ps, seg_a, ss) - _link(d, ps, seg_b, ss) - inner
+                    if accept(r, s, new_r, new_s):
+                        return r, s, (route_r[:i] + seg_b + route_r[i + la:],
+                                      route_s[:start] + seg_a + route_s[start + lb:])
+            
+            # 2-opt*: reconnect so that a is followed by c
+            if two_opt_star:
+                na, pc, nc = route_r[i + 1], route_s[j - 1], route_s[j + 1]
+                tail_r, tail_s = len(route_r) - 1 - i, len(route_s) - j
+                # Tails swapped: r = ..a c.., s = ..pc na..
+                if capacity is None or (i - 1 + tail_s <= capacity and j - 1 + tail_r - 1 <= capacity):
+                    head_r, head_s = prefix[r][i], prefix[s][j - 1]
+                    new_r = head_r + d[a][c] + (lengths[s] - head_s - d[pc][c])
+                    new_s = head_s + d[pc][na] + (lengths[r] - head_r - d[a][na])
+                    if accept(r, s, new_r, new_s):
+                        return r, s, (route_r[:i + 1] + route_s[j:], route_s[:j] + route_r[i + 1:])
+                # Heads joined: r = ..a c.. back to the depot, s = depot ..na nc..
+                if capacity is None or (i + j <= capacity and tail_r - 1 + len(route_s) - 2 - j <= capacity):
+                    head_r, head_s = prefix[r][i], prefix[s][j]
+                    new_r = head_r + d[a][c] + head_s
+                    new_s = (lengths[r] - head_r - d[a][na]) + d[na][nc] + (lengths[s] - head_s - d[c][nc])
+                    if accept(r, s, new_r, new_s):
+                        return r, s, (route_r[:i + 1] + route_s[:j + 1][::-1],
+                                      route_r[i + 1:][::-1] + route_s[j + 1:])
+        return None
+    
+    customers = [city for route in routes for city in route[1:-1]]
+    queue = deque(customers)
+    queued = [False] * len(distance_matrix)
+    for city in customers:
+        queued[city] = True
+    changed = set()
+    
+    moves = 0
+    while queue and (max_moves is None or moves < max_moves):
+        a = queue.popleft()
+        queued[a] = False
+        move = find_move(a)
+        if move is None:
+            continue
+        
+        r, s, (new_route_r, new_route_s) = move
+        touched = set(routes[r]) | set(routes[s])
+        for k, route in ((r, new_route_r), (s, new_route_s)):
+            routes[k] = route
+            lengths[k] = distance_matrix.route_length(route)
+            index_route(k)
+            changed.add(k)
+        moves += 1
+        # Customers of both routes see new neighbors on them
+        for city in touched:
+            if city != 0 and not queued[city]:
+                queued[city] = True
+                queue.append(city)
+    
+    instrumentation.count('inter_route.moves_applied', moves)
+    
+    for k in changed:
+        routes[k], lengths[k] = two_opt(routes[k], distance_matrix, num_neighbors)
+    return routes, lengths
+
+# Operators selectable by name, e.g. through a solver's ``local_search`` option
+LOCAL_SEARCH_OPERATORS = {
+    '2opt': two_opt,
+    'or_opt': or_opt,
+    'swap': swap,
+    'or_3opt': or_3opt,
+    'lk': lin_kernighan
+}
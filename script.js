@@ -331,18 +331,40 @@ function solveMTSP() {
     }, 1000);
     
     /* Uncomment when backend is ready
-    // Send data to backend
-    fetch('/solve', {
+    // Send data to backend, drawing improved routes as they stream in
+    streamSolve({
+        depot: {lat: depot.lat, lng: depot.lng},
+        locations: locations,
+        numSalesmen: numSalesmen,
+        algorithm: algorithm
+    });
+    */
+}
+
+// Submit a solve job and redraw the routes for every improved solution
+// streamed back over Server-Sent Events until the final one arrives
+function streamSolve(payload) {
+    const showError = (error) => {
+        // Force hide loading spinner with both class and inline style
+        const loadingElement = document.getElementById('loading');
+        loadingElement.classList.add('hidden');
+        loadingElement.style.display = 'none';
+        
+        console.error('Error:', error);
+        alert('An error occurred while solving the problem.');
+    };
+    
+    const showSolution = (data) => {
+        clearRoutes();
+        processSolutionData(data);
+    };
+    
+    fetch('/jobs', {
         method: 'POST',
         headers: {
             'Content-Type': 'application/json',
         },
-        body: JSON.stringify({
-            depot: {lat: depot.lat, lng: depot.lng},
-            locations: locations,
-            numSalesmen: numSalesmen,
-            algorithm: algorithm
-        })
+        body: JSON.stringify(payload)
     })
     .then(response => {
         if (!response.ok) {
@@ -350,19 +372,32 @@ function solveMTSP() {
         }
         return response.json();
     })
-    .then(data => {
-        processSolutionData(data);
-    })
-    .catch(error => {
-        // Force hide loading spinner with both class and inline style
-        const loadingElement = document.getElementById('loading');
-        loadingElement.classList.add('hidden');
-        loadingElement.style.display = 'none';
+    .then(job => {
+        const events = new EventSource(`/jobs/${job.jobId}/events`);
         
-        console.error('Error:', error);
-        alert('An error occurred while solving the problem.');
-    });
-    */
+        // Show each improvement right away; the loading spinner is hidden by the first one
+        events.addEventListener('incumbent', event => {
+            showSolution(JSON.parse(event.data));
+        });
+        
+        events.addEventListener('done', event => {
+            events.close();
+            showSolution(JSON.parse(event.data).result);
+        });
+        
+        ['failed', 'cancelled'].forEach(type => {
+            events.addEventListener(type, event => {
+                events.close();
+                showError(JSON.parse(event.data).error || `Job ${type}`);
+            });
+        });
+        
+        events.onerror = () => {
+            events.close();
+            showError('Lost connection to the solver');
+        };
+    })
+    .catch(showError);
 }
 
 // Separate function to process solution data
@@ -2,6 +2,17 @@ import numpy as np
 import random
 import math
 import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+
+import instrumentation
+from construction import initial_tours, nearest_neighbor_tour, randomized_nearest_neighbor_tour
+from local_search import LOCAL_SEARCH_OPERATORS, improve_routes, lin_kernighan, two_opt
+
+# Warm starts: pheromone multiplier for the prior route's edges, and the
+# stagnation limit used when none is given (they begin near a good solution)
+WARM_START_BOOST = 4.0
+WARM_START_STAGNATION = 5
 
 # Utility functions
 def calculate_distance(point1, point2):
@@ -16,182 +27,403 @@ def calculate_total_distance(route, points):
         total += calculate_distance(points[route[i]], points[route[i + 1]])
     return total
 
+# K-means switches to mini-batch updates of this many points for larger location sets
+KMEANS_BATCH_SIZE = 1024
+KMEANS_BATCH_THRESHOLD = 10000
+
+# Rows of the distance matrix filled (or searched for neighbours) per step
+DISTANCE_BLOCK_ROWS = 512
+
+# Largest matrix kept as nested lists as well (about 32 MB at this size)
+DISTANCE_ROWS_LIMIT = 1000
+
+class DistanceMatrix:
+    """Pairwise distances between points, computed once and shared by the solvers.
+
+    Solvers address points by their integer index, so evaluating a route is a
+    pair of array lookups instead of dict access plus ``math.sqrt``.
+    """
+    def __init__(self, points=None, matrix=None):
+        if matrix is None:
+            coords = np.array([[p['lat'], p['lng']] for p in points], dtype=float).reshape(-1, 2)
+            lat, lng = coords[:, 0], coords[:, 1]
+            # Built in place, one axis at a time and in row blocks, so the
+            # peak memory stays close to that of the matrix itself
+            matrix = np.subtract.outer(lat, lat)
+            matrix *= matrix
+            for start in range(0, len(coords), DISTANCE_BLOCK_ROWS):
+                block = lng[start:start + DISTANCE_BLOCK_ROWS, None] - lng[None, :]
+                block *= block
+                matrix[start:start + DISTANCE_BLOCK_ROWS] += block
+            np.sqrt(matrix, out=matrix)
+            matrix *= 111.32  # Convert to km
+        self.matrix = np.asarray(matrix, dtype=float)
+        self._rows = None
+        self._neighbors = {}
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    @property
+    def rows(self):
+        """The matrix as nested lists, for fast scalar lookups in Python loops.
+        
+        Above ``DISTANCE_ROWS_LIMIT`` points the lists would take several
+        times the array's memory, so the array itself is returned instead.
+        """
+        if len(self) > DISTANCE_ROWS_LIMIT:
+            return self.matrix
+        if self._rows is None:
+            self._rows = self.matrix.tolist()
+        return self._rows
+
+    def neighbors(self, k):
+        """For every point, the indices of its ``k`` nearest other points, closest first."""
+        n = len(self)
+        k = min(k, n - 1)
+        if k not in self._neighbors:
+            if k <= 0:
+                self._neighbors[k] = [[] for _ in range(n)]
+            else:
+                neighbors = []
+                for start in range(0, n, DISTANCE_BLOCK_ROWS):
+                    block = self.matrix[start:start + DISTANCE_BLOCK_ROWS].copy()
+                    rows = np.arange(len(block))
+                    block[rows, start + rows] = np.inf  # A point is not its own neighbour
+                    nearest = np.argpartition(block, k - 1, axis=1)[:, :k]
+                    order = np.argsort(np.take_along_axis(block, nearest, axis=1), axis=1)
+                    neighbors.extend(np.take_along_axis(nearest, order, axis=1).tolist())
+                self._neighbors[k] = neighbors
+        return self._neighbors[k]
+
+    def subset(self, indices):
+        """Distance matrix restricted to ``indices`` (re-indexed from 0)."""
+        idx = np.asarray(indices, dtype=np.intp)
+        return DistanceMatrix(matrix=self.matrix[np.ix_(idx, idx)])
+
+    def route_length(self, route):
+        """Total length of a route given as a sequence of point indices."""
+        instrumentation.count('fitness_evaluations')
+        route = np.asarray(route, dtype=np.intp)
+        if len(route) < 2:
+            return 0.0
+        return float(self.matrix[route[:-1], route[1:]].sum())
+
+    def route_lengths(self, routes):
+        """Total lengths of equally long routes stacked as rows of a 2-D array."""
+        routes = np.asarray(routes, dtype=np.intp)
+        instrumentation.count('fitness_evaluations', len(routes))
+        return self.matrix[routes[:, :-1], routes[:, 1:]].sum(axis=1)
+
+def make_incumbent(solution, fitness, iteration, start_time):
+    """Snapshot of an improved best solution, as yielded by the solvers' ``iterate``."""
+    return {
+        'solution': list(solution),
+        'fitness': float(fitness),
+        'iteration': iteration,
+        'elapsed': time.time() - start_time
+    }
+
+class StopCondition:
+    """Early-stopping rule shared by the solvers.
+    
+    A run stops once ``time_limit`` seconds have passed since ``start``, or
+    after ``stagnation_limit`` consecutive iterations in which the best
+    fitness did not improve by more than ``min_improvement`` (relative).
+    Either rule is disabled when left at None.
+    """
+    def __init__(self, time_limit=None, stagnation_limit=None, min_improvement=0.0):
+        self.time_limit = time_limit
+        self.stagnation_limit = stagnation_limit
+        self.min_improvement = min_improvement
+        self.start()
+    
+    def start(self):
+        """Start the clock and forget previous progress."""
+        self.deadline = time.time() + self.time_limit if self.time_limit is not None else None
+        self.best_fitness = float('inf')
+        self.stagnant_iterations = 0
+    
+    def update(self, fitness):
+        """Record the best fitness at the end of an iteration."""
+        if fitness < self.best_fitness * (1 - self.min_improvement) or self.best_fitness == float('inf'):
+            self.best_fitness = fitness
+            self.stagnant_iterations = 0
+        else:
+            self.stagnant_iterations += 1
+    
+    def should_stop(self):
+        """Whether the time budget is spent or the search has stagnated."""
+        if self.deadline is not None and time.time() >= self.deadline:
+            return True
+        return self.stagnation_limit is not None and self.stagnant_iterations >= self.stagnation_limit
+
 # Spider Monkey Optimization
 class SMO:
-    def __init__(self, points, num_monkeys=20, max_iterations=50):
+    def __init__(self, points, num_monkeys=20, max_iterations=50, distance_matrix=None,
+                 time_limit=None, stagnation_limit=None, min_improvement=0.0, initial_solution=None,
+                 local_search=None, seed_fraction=0.25):
         self.points = points
         self.num_points = len(points)
+        self.distance_matrix = distance_matrix if distance_matrix is not None else DistanceMatrix(points)
         self.num_monkeys = num_monkeys
         self.max_iterations = max_iterations
-        self.population = []
-        self.global_leader = None
-        self.local_leaders = []
+        self.stop = StopCondition(time_limit, stagnation_limit, min_improvement)
+        self.initial_solution = initial_solution  # Prior route to warm start from
+        # Optional LOCAL_SEARCH_OPERATORS name used to polish every new global leader
+        self.local_search_operator = LOCAL_SEARCH_OPERATORS[local_search] if local_search else None
+        # Share of the population started from constructive tours (see initial_tours)
+        self.seed_fraction = seed_fraction
         self.num_groups = 4
         self.local_limit = 5
         self.global_limit = 10
         
+        # Population store: one route per row (depot first and last) with
+        # parallel fitness and limit-counter arrays
+        self.positions = None
+        self.fitness = None
+        self.local_limit_count = None
+        self.global_limit_count = None
+        
+        # Leaders are copies of population rows together with the limit
+        # counters the monkey had when it became leader
+        self.global_leader = None
+        self.global_leader_fitness = float('inf')
+        self.global_leader_limit_count = 0
+        self.local_leaders = None
+        self.local_leader_fitness = None
+        self.local_leader_limit_count = None
+        
+        # Fixed group membership: (start, end) rows of each group
+        self.group_bounds = []
+        self.group_of = None
+        
+        # Best solution found so far (the global leader may be restarted)
+        self.best_solution = None
+        self.best_fitness = float('inf')
+    
+    def random_solutions(self, count):
+        """Random routes over all points, depot (0) at start and end."""
+        solutions = np.zeros((count, self.num_points + 1), dtype=np.int32)
+        perms = np.argsort(np.random.random((count, self.num_points - 1)), axis=1) + 1
+        solutions[:, 1:-1] = perms
+        return solutions
+    
+    def perturbed_solutions(self, solution, count):
+        """``solution`` followed by ``count - 1`` copies of it with one random segment reversed."""
+        solutions = np.tile(np.asarray(solution, dtype=np.int32), (count, 1))
+        if self.num_points > 3:
+            for row in solutions[1:]:
+                i, j = sorted(random.sample(range(1, self.num_points), 2))
+                row[i:j + 1] = row[i:j + 1][::-1].copy()
+        return solutions
+    
+    def restart_solution(self):
+        """Fresh route for a stuck leader: randomized nearest neighbor when seeding, else random."""
+        if self.seed_fraction > 0:
+            return np.asarray(randomized_nearest_neighbor_tour(self.distance_matrix), dtype=np.int32)
+        return self.random_solutions(1)[0]
+    
     def initialize(self):
-        """Initialize the population with random solutions."""
-        self.population = []
-        for _ in range(self.num_monkeys):
-            # Create random permutation excluding the depot (0)
-            perm = list(range(1, self.num_points))
-            random.shuffle(perm)
-            # Add depot at start and end
-            solution = [0] + perm + [0]
-            fitness = calculate_total_distance(solution, self.points)
-            self.population.append({
-                'solution': solution,
-                'fitness': fitness,
-                'local_limit_count': 0,
-                'global_limit_count': 0
-            })
-        
-        # Sort population by fitness
-        self.population.sort(key=lambda x: x['fitness'])
-        self.global_leader = self.population[0].copy()
+        """Initialize the population with random solutions.
+        
+        With an initial solution, half of the population is that route and
+        perturbed copies of it instead. A ``seed_fraction`` of the rest are
+        constructive tours, spread over the groups.
+        """
+        m = self.num_monkeys
+        self.positions = self.random_solutions(m)
+        warm = 0
+        if self.initial_solution is not None:
+            warm = (m + 1) // 2
+            self.positions[:warm] = self.perturbed_solutions(self.initial_solution, warm)
+        seeded = min(m - warm, int(round(self.seed_fraction * m)))
+        if seeded > 0:
+            rows = np.linspace(warm, m - 1, seeded).round().astype(np.intp)
+            self.positions[rows] = initial_tours(self.distance_matrix, seeded, self.points)
+        self.fitness = self.distance_matrix.route_lengths(self.positions)
+        self.local_limit_count = np.zeros(m, dtype=np.int32)
+        self.global_limit_count = np.zeros(m, dtype=np.int32)
+        
+        best = int(np.argmin(self.fitness))
+        self.global_leader = self.positions[best].copy()
+        self.global_leader_fitness = float(self.fitness[best])
+        self.global_leader_limit_count = int(self.global_limit_count[best])
         
         # Divide into groups and assign local leaders
-        group_size = self.num_monkeys // self.num_groups
-        self.local_leaders = []
-        for i in range(self.num_groups):
+        num_groups = min(self.num_groups, m)
+        group_size = m // num_groups
+        self.group_bounds = []
+        self.group_of = np.zeros(m, dtype=np.intp)
+        for i in range(num_groups):
             start_idx = i * group_size
-            end_idx = (i + 1) * group_size if i < self.num_groups - 1 else self.num_monkeys
-            group = self.population[start_idx:end_idx]
-            group.sort(key=lambda x: x['fitness'])
-            self.local_leaders.append(group[0].copy())
+            end_idx = (i + 1) * group_size if i < num_groups - 1 else m
+            self.group_bounds.append((start_idx, end_idx))
+            self.group_of[start_idx:end_idx] = i
+        
+        leaders = [start + int(np.argmin(self.fitness[start:end])) for start, end in self.group_bounds]
+        self.local_leaders = self.positions[leaders].copy()
+        self.local_leader_fitness = self.fitness[leaders].copy()
+        self.local_leader_limit_count = self.local_limit_count[leaders].copy()
     
     def local_leader_phase(self):
         """Update positions based on local leader."""
-        for i, monkey in enumerate(self.population):
-            group_id = min(i // (self.num_monkeys // self.num_groups), self.num_groups - 1)
-            local_leader = self.local_leaders[group_id]['solution']
-            
-            # Create new solution based on local leader
-            new_solution = self.create_new_solution(monkey['solution'], local_leader)
-            new_fitness = calculate_total_distance(new_solution, self.points)
-            
-            # Update if better
-            if new_fitness < monkey['fitness']:
-                self.population[i]['solution'] = new_solution
-                self.population[i]['fitness'] = new_fitness
-                self.population[i]['local_limit_count'] = 0
-            else:
-                self.population[i]['local_limit_count'] += 1
+        # Create new solutions for the whole population based on each group's local leader
+        new_solutions = self.create_new_solutions(self.positions, self.local_leaders[self.group_of])
+        new_fitness = self.distance_matrix.route_lengths(new_solutions)
+        
+        # Update if better
+        better = new_fitness < self.fitness
+        self.positions[better] = new_solutions[better]
+        self.fitness[better] = new_fitness[better]
+        self.local_limit_count[better] = 0
+        self.local_limit_count[~better] += 1
     
     def global_leader_phase(self):
         """Update positions based on global leader."""
-        for i, monkey in enumerate(self.population):
-            if random.random() > 0.5:  # Probability of update
-                global_leader = self.global_leader['solution']
-                
-                # Create new solution based on global leader
-                new_solution = self.create_new_solution(monkey['solution'], global_leader)
-                new_fitness = calculate_total_distance(new_solution, self.points)
-                
-                # Update if better
-                if new_fitness < monkey['fitness']:
-                    self.population[i]['solution'] = new_solution
-                    self.population[i]['fitness'] = new_fitness
-                    self.population[i]['global_limit_count'] = 0
-                else:
-                    self.population[i]['global_limit_count'] += 1
+        selected = np.flatnonzero(np.random.random(self.num_monkeys) > 0.5)  # Probability of update
+        if len(selected) == 0:
+            return
+        
+        # Create new solutions based on global leader
+        leaders = np.broadcast_to(self.global_leader, (len(selected), len(self.global_leader)))
+        new_solutions = self.create_new_solutions(self.positions[selected], leaders)
+        new_fitness = self.distance_matrix.route_lengths(new_solutions)
+        
+        # Update if better
+        better = new_fitness < self.fitness[selected]
+        improved, stalled = selected[better], selected[~better]
+        self.positions[improved] = new_solutions[better]
+        self.fitness[improved] = new_fitness[better]
+        self.global_limit_count[improved] = 0
+        self.global_limit_count[stalled] += 1
     
     def local_leader_decision(self):
         """Update local leaders."""
-        for group_id in range(self.num_groups):
-            start_idx = group_id * (self.num_monkeys // self.num_groups)
-            end_idx = (group_id + 1) * (self.num_monkeys // self.num_groups) if group_id < self.num_groups - 1 else self.num_monkeys
-            group = self.population[start_idx:end_idx]
-            group.sort(key=lambda x: x['fitness'])
+        for group_id, (start_idx, end_idx) in enumerate(self.group_bounds):
+            best = start_idx + int(np.argmin(self.fitness[start_idx:end_idx]))
             
-            if group[0]['fitness'] < self.local_leaders[group_id]['fitness']:
-                self.local_leaders[group_id] = group[0].copy()
+            if self.fitness[best] < self.local_leader_fitness[group_id]:
+                self.local_leaders[group_id] = self.positions[best]
+                self.local_leader_fitness[group_id] = self.fitness[best]
+                self.local_leader_limit_count[group_id] = self.local_limit_count[best]
                 
             # Check if local leader is stuck
-            if self.local_leaders[group_id]['local_limit_count'] > self.local_limit:
-                self.local_leaders[group_id]['local_limit_count'] = 0
+            if self.local_leader_limit_count[group_id] > self.local_limit:
+                self.local_leader_limit_count[group_id] = 0
                 # Generate a new solution
-                perm = list(range(1, self.num_points))
-                random.shuffle(perm)
-                self.local_leaders[group_id]['solution'] = [0] + perm + [0]
-                self.local_leaders[group_id]['fitness'] = calculate_total_distance(
-                    self.local_leaders[group_id]['solution'], self.points
+                self.local_leaders[group_id] = self.restart_solution()
+                self.local_leader_fitness[group_id] = self.distance_matrix.route_length(
+                    self.local_leaders[group_id]
                 )
     
     def global_leader_decision(self):
         """Update global leader."""
-        self.population.sort(key=lambda x: x['fitness'])
+        best = int(np.argmin(self.fitness))
         
-        if self.population[0]['fitness'] < self.global_leader['fitness']:
-            self.global_leader = self.population[0].copy()
+        if self.fitness[best] < self.global_leader_fitness:
+            # Polish the new leader in place first, when a local search is set
+            if self.local_search_operator is not None:
+                with instrumentation.phase('smo.local_search'):
+                    improved, improved_fitness = self.local_search_operator(self.positions[best].tolist(),
+                                                                            self.distance_matrix)
+                self.positions[best] = improved
+                self.fitness[best] = improved_fitness
+            self.global_leader = self.positions[best].copy()
+            self.global_leader_fitness = float(self.fitness[best])
+            self.global_leader_limit_count = int(self.global_limit_count[best])
             
         # Check if global leader is stuck
-        if self.global_leader['global_limit_count'] > self.global_limit:
-            self.global_leader['global_limit_count'] = 0
+        if self.global_leader_limit_count > self.global_limit:
+            self.global_leader_limit_count = 0
             # Generate a new solution
-            perm = list(range(1, self.num_points))
-            random.shuffle(perm)
-            self.global_leader['solution'] = [0] + perm + [0]
-            self.global_leader['fitness'] = calculate_total_distance(
-                self.global_leader['solution'], self.points
-            )
-    
-    def create_new_solution(self, current, leader):
-        """Create a new solution by using parts of leader solution."""
-        # Use ordered crossover (OX) between current solution and leader
-        # Exclude depot (first and last positions)
-        current_mid = current[1:-1]
-        leader_mid = leader[1:-1]
-        
-        # Choose crossover points
-        if len(current_mid) <= 2:
-            cx_points = [0, len(current_mid)]
-        else:
-            cx_points = sorted(random.sample(range(len(current_mid)), 2))
-        
-        # Create offspring using OX
-        offspring = [-1] * len(current_mid)
-        
-        # Copy the segment between crossover points from current solution
-        for i in range(cx_points[0], cx_points[1]):
-            if i < len(offspring):
-                offspring[i] = current_mid[i]
-        
-        # Fill the remaining positions from leader
-        j = 0
-        for i in range(len(offspring)):
-            if offspring[i] == -1:
-                while j < len(leader_mid) and leader_mid[j] in offspring:
-                    j += 1
-                if j < len(leader_mid):
-                    offspring[i] = leader_mid[j]
-                    j += 1
-                else:
-                    # If we've used all leader points, find an unused point
-                    for k in range(1, self.num_points):
-                        if k not in offspring:
-                            offspring[i] = k
-                            break
+            self.global_leader = self.restart_solution()
+            self.global_leader_fitness = self.distance_matrix.route_length(self.global_leader)
+    
+    def top_solutions(self, count):
+        """The ``count`` best routes in the population, best first."""
+        order = np.argsort(self.fitness)[:count]
+        return self.positions[order], self.fitness[order]
+    
+    def create_new_solutions(self, current, leaders):
+        """Ordered crossover for a batch of routes at once.
+        
+        Row ``i`` of the result keeps a random segment of ``current[i]`` and
+        fills the remaining positions with the other points in the order they
+        appear in ``leaders[i]``.
+        """
+        current = np.asarray(current)
+        leaders = np.asarray(leaders)
+        offspring = current.copy()
+        count, size = current.shape[0], current.shape[1] - 2
+        instrumentation.count('crossovers', count)
+        if size <= 2:
+            return offspring
+        
+        # Choose two distinct crossover points per row
+        a = np.random.randint(0, size, count)
+        b = np.random.randint(0, size - 1, count)
+        b += b >= a
+        lo, hi = np.minimum(a, b), np.maximum(a, b)
+        cols = np.arange(size)
+        keep = (cols >= lo[:, None]) & (cols < hi[:, None])
+        
+        current_mid = current[:, 1:-1]
+        leader_mid = leaders[:, 1:-1]
+        rows = np.broadcast_to(np.arange(count)[:, None], keep.shape)
         
-        # Add depot at start and end
-        return [0] + offspring + [0]
+        # Mark the points copied from current, then take the leader's other
+        # points in order; row-major order lines both sides up per row
+        used = np.zeros((count, self.num_points), dtype=bool)
+        used[rows[keep], current_mid[keep]] = True
+        fill = ~used[rows, leader_mid]
+        mid = offspring[:, 1:-1]
+        mid[~keep] = leader_mid[fill]
+        return offspring
     
-    def run(self):
-        """Run the SMO algorithm."""
-        self.initialize()
+    def iterate(self):
+        """Run the SMO algorithm, yielding an incumbent whenever the best solution improves."""
+        start_time = time.time()
+        self.stop.start()
+        with instrumentation.phase('smo.initialize'):
+            self.initialize()
+        self.best_solution = self.global_leader.tolist()
+        self.best_fitness = self.global_leader_fitness
+        self.stop.update(self.best_fitness)
+        yield make_incumbent(self.best_solution, self.best_fitness, 0, start_time)
         
-        for _ in range(self.max_iterations):
-            self.local_leader_phase()
-            self.global_leader_phase()
-            self.local_leader_decision()
-            self.global_leader_decision()
+        for iteration in range(1, self.max_iterations + 1):
+            if self.stop.should_stop():
+                break
+            
+            with instrumentation.phase('smo.local_leader_phase'):
+                self.local_leader_phase()
+            with instrumentation.phase('smo.global_leader_phase'):
+                self.global_leader_phase()
+            with instrumentation.phase('smo.leader_decisions'):
+                self.local_leader_decision()
+                self.global_leader_decision()
+            
+            if self.global_leader_fitness < self.best_fitness:
+                self.best_solution = self.global_leader.tolist()
+                self.best_fitness = self.global_leader_fitness
+                yield make_incumbent(self.best_solution, self.best_fitness, iteration, start_time)
+            self.stop.update(self.best_fitness)
+    
+    def run(self, callback=None):
+        """Run the SMO algorithm, passing each improved incumbent to ``callback``."""
+        for incumbent in self.iterate():
+            if callback:
+                callback(incumbent)
         
-        return self.global_leader['solution'], self.global_leader['fitness']
+        return self.best_solution, self.best_fitness
 
 # Ant Colony Optimization
 class ACO:
-    def __init__(self, points, num_ants=20, alpha=1.0, beta=2.0, evap_rate=0.5, max_iterations=50):
+    def __init__(self, points, num_ants=20, alpha=1.0, beta=2.0, evap_rate=0.5, max_iterations=50,
+                 distance_matrix=None, batch_construction=True, candidate_size=None,
+                 time_limit=None, stagnation_limit=None, min_improvement=0.0, initial_solution=None,
+                 local_search='2opt'):
         self.points = points
         self.num_points = len(points)
         self.num_ants = num_ants
@@ -199,19 +431,38 @@ class ACO:
         self.beta = beta    # Distance importance
         self.evap_rate = evap_rate  # Pheromone evaporation rate
         self.max_iterations = max_iterations
+        self.batch_construction = batch_construction  # Advance all ants together with NumPy
+        self.candidate_size = candidate_size  # Restrict choices to nearest neighbors (None = all)
+        self.local_search_operator = LOCAL_SEARCH_OPERATORS[local_search]  # Applied to some ants' tours
+        self.stop = StopCondition(time_limit, stagnation_limit, min_improvement)
         
-        # Initialize distance matrix
-        self.distances = np.zeros((self.num_points, self.num_points))
-        for i in range(self.num_points):
-            for j in range(self.num_points):
-                if i != j:
-                    self.distances[i][j] = calculate_distance(points[i], points[j])
+        # Shared distance matrix
+        self.distance_matrix = distance_matrix if distance_matrix is not None else DistanceMatrix(points)
+        self.distances = self.distance_matrix.matrix
         
-        # Initialize pheromone matrix
-        self.pheromones = np.ones((self.num_points, self.num_points))
+        # Heuristic desirability (1/d), 1.0 for coincident points
+        with np.errstate(divide='ignore'):
+            self.heuristic = np.where(self.distances > 0, 1.0 / self.distances, 1.0)
+        
+        # Initialize pheromone matrix to tau0 = num_ants / L_nn, the level
+        # the ants' deposits settle around on nearest-neighbor quality tours
+        nn_length = self.distance_matrix.route_length(nearest_neighbor_tour(self.distance_matrix))
+        tau0 = num_ants / nn_length if nn_length > 0 else 1.0
+        self.pheromones = np.full((self.num_points, self.num_points), tau0)
         
         self.best_solution = None
         self.best_fitness = float('inf')
+        
+        # Warm start: begin from the prior route and favour its edges
+        if initial_solution is not None:
+            self.best_solution = list(initial_solution)
+            self.best_fitness = self.distance_matrix.route_length(initial_solution)
+            tour = np.asarray(initial_solution, dtype=np.intp)
+            self.pheromones[tour[:-1], tour[1:]] *= WARM_START_BOOST
+        
+        # Cached pheromone**alpha * eta**beta, refreshed once per iteration
+        self.choice_info = None
+        self.update_choice_info()
     
     def construct_solution(self):
         """Construct a solution for an ant."""
@@ -224,12 +475,11 @@ class ACO:
         while len(solution) < self.num_points:
             probabilities = []
             
+            choice_row = self.choice_info[current]
             for j in range(self.num_points):
                 if not visited[j]:
-                    # Calculate probability based on pheromone and distance
-                    pheromone = self.pheromones[current][j] ** self.alpha
-                    distance = (1.0 / self.distances[current][j]) ** self.beta if self.distances[current][j] > 0 else 1.0
-                    probabilities.append((j, pheromone * distance))
+                    # Probability based on pheromone and distance
+                    probabilities.append((j, choice_row[j]))
             
             # Roulette wheel selection
             if not probabilities:
@@ -258,62 +508,120 @@ class ACO:
         solution.append(0)
         return solution
     
+    def construct_solutions(self):
+        """Construct solutions for all ants at once.
+        
+        Every step advances all ants together: the transition weights
+        ``pheromone**alpha * eta**beta`` of each ant's current city are masked
+        by its visited set and sampled with a cumulative sum. With
+        ``candidate_size`` set, ants first choose among the nearest unvisited
+        neighbors and only fall back to the full row when those are exhausted.
+        """
+        n = self.num_points
+        m = self.num_ants
+        weights = self.choice_info
+        
+        candidates = None
+        if self.candidate_size and self.candidate_size < n - 1:
+            candidates = np.array(self.distance_matrix.neighbors(self.candidate_size), dtype=np.intp)
+        
+        ants = np.arange(m)
+        tours = np.zeros((m, n + 1), dtype=np.intp)
+        visited = np.zeros((m, n), dtype=bool)
+        visited[:, 0] = True  # Start at depot
+        current = np.zeros(m, dtype=np.intp)
+        
+        for step in range(1, n):
+            next_city = np.empty(m, dtype=np.intp)
+            pending = np.ones(m, dtype=bool)
+            
+            if candidates is not None:
+                cand = candidates[current]
+                cand_weights = weights[current[:, None], cand] * ~visited[ants[:, None], cand]
+                has_candidate = cand_weights.sum(axis=1) > 0
+                if has_candidate.any():
+                    choice = self._roulette(cand_weights[has_candidate])
+                    next_city[has_candidate] = cand[has_candidate, choice]
+                    pending = ~has_candidate
+            
+            if pending.any():
+                rows = current[pending]
+                unvisited = ~visited[pending]
+                row_weights = weights[rows] * unvisited
+                # Choose uniformly among unvisited cities if all weights are zero
+                zero = row_weights.sum(axis=1) <= 0
+                row_weights[zero] = unvisited[zero]
+                next_city[pending] = self._roulette(row_weights)
+            
+            tours[:, step] = next_city
+            visited[ants, next_city] = True
+            current = next_city
+        
+        # Return to depot (last column is already 0)
+        return tours.tolist()
+    
+    @staticmethod
+    def _roulette(weights):
+        """Sample one column per row of ``weights`` proportionally to its weight."""
+        cumulative = np.cumsum(weights, axis=1)
+        r = np.random.random(len(weights)) * cumulative[:, -1]
+        # Guard against rounding pushing r onto the total
+        r[r >= cumulative[:, -1]] = 0.0
+        return np.argmax(cumulative > r[:, None], axis=1)
+    
+    def update_choice_info(self):
+        """Recompute the cached pheromone**alpha * eta**beta transition weights."""
+        self.choice_info = (self.pheromones ** self.alpha) * (self.heuristic ** self.beta)
+    
     def update_pheromones(self, solutions):
         """Update pheromone levels based on solutions."""
         # Evaporation
         self.pheromones *= (1 - self.evap_rate)
         
-        # Deposit new pheromones based on solution quality
-        for solution, fitness in solutions:
-            # Use inverse of fitness (better solutions deposit more pheromone)
-            pheromone_deposit = 1.0 / max(0.1, fitness)  # Avoid division by zero
-            for i in range(len(solution) - 1):
-                self.pheromones[solution[i]][solution[i + 1]] += pheromone_deposit
+        if not solutions:
+            return
+        
+        # Deposit new pheromones based on solution quality in one scatter-add
+        # Use inverse of fitness (better solutions deposit more pheromone)
+        tours = np.array([solution for solution, _ in solutions], dtype=np.intp)
+        deposits = 1.0 / np.maximum(0.1, [fitness for _, fitness in solutions])  # Avoid division by zero
+        np.add.at(self.pheromones, (tours[:, :-1], tours[:, 1:]),
+                  np.broadcast_to(deposits[:, None], (len(tours), tours.shape[1] - 1)))
     
     def local_search(self, solution):
-        """Apply 2-opt local search to improve a solution."""
-        improved = True
-        best_route = solution.copy()
-        best_distance = calculate_total_distance(best_route, self.points)
-        
-        while improved:
-            improved = False
-            for i in range(1, len(best_route) - 2):
-                for j in range(i + 1, len(best_route) - 1):
-                    # Skip if indices are adjacent
-                    if j - i <= 1:
-                        continue
-                    
-                    # Create new route with 2-opt swap
-                    new_route = best_route[:i] + best_route[i:j+1][::-1] + best_route[j+1:]
-                    new_distance = calculate_total_distance(new_route, self.points)
-                    
-                    # Update if better
-                    if new_distance < best_distance:
-                        best_distance = new_distance
-                        best_route = new_route
-                        improved = True
-                        break
-                
-                if improved:
-                    break
-        
-        return best_route, best_distance
+        """Apply the configured local search (2-opt by default) to improve a solution."""
+        return self.local_search_operator(solution, self.distance_matrix)
     
-    def run(self):
-        """Run the ACO algorithm."""
+    def iterate(self):
+        """Run the ACO algorithm, yielding an incumbent whenever the best solution improves."""
+        start_time = time.time()
+        self.stop.start()
+        
+        # Pheromones may have been seeded externally since construction
+        self.update_choice_info()
+        
         for iteration in range(self.max_iterations):
+            # Always complete one iteration unless a solution was provided
+            if self.best_solution is not None and self.stop.should_stop():
+                break
+            
             solutions = []
+            previous_best = self.best_fitness
             
             # Construct solutions for each ant
-            for _ in range(self.num_ants):
-                solution = self.construct_solution()
-                
+            with instrumentation.phase('aco.construction'):
+                if self.batch_construction:
+                    constructed = self.construct_solutions()
+                else:
+                    constructed = [self.construct_solution() for _ in range(self.num_ants)]
+            
+            for solution in constructed:
                 # Apply local search to improve solution
                 if random.random() < 0.3:  # Apply local search with 30% probability
-                    solution, fitness = self.local_search(solution)
+                    with instrumentation.phase('aco.local_search'):
+                        solution, fitness = self.local_search(solution)
                 else:
-                    fitness = calculate_total_distance(solution, self.points)
+                    fitness = self.distance_matrix.route_length(solution)
                 
                 solutions.append((solution, fitness))
                 
@@ -323,279 +631,891 @@ class ACO:
                     self.best_fitness = fitness
             
             # Update pheromone levels
-            self.update_pheromones(solutions)
+            with instrumentation.phase('aco.pheromone_update'):
+                self.update_pheromones(solutions)
+                
+                # Adaptive parameter adjustment
+                if iteration > 0 and iteration % 5 == 0:
+                    # Gradually increase exploitation over exploration
+                    self.alpha *= 1.05
+                    self.beta *= 1.02
+                    self.alpha = min(3.0, self.alpha)  # Cap at 3.0
+                    self.beta = min(5.0, self.beta)    # Cap at 5.0
+                
+                self.update_choice_info()
+            
+            if self.best_fitness < previous_best:
+                yield make_incumbent(self.best_solution, self.best_fitness, iteration + 1, start_time)
+            self.stop.update(self.best_fitness)
+    
+    def run(self, callback=None):
+        """Run the ACO algorithm, passing each improved incumbent to ``callback``."""
+        for incumbent in self.iterate():
+            if callback:
+                callback(incumbent)
+        
+        return self.best_solution, self.best_fitness
+
+# Iterated Lin-Kernighan style local search
+class LinKernighan:
+    """Single-tour solver for large clusters, built on ``lin_kernighan``.
+    
+    A nearest-neighbor tour (or ``initial_solution``) is improved with 2-opt
+    and then with LK-style variable-depth moves and Or-opt. Each iteration
+    then kicks the best tour by swapping two adjacent segments of up to
+    ``kick_length`` cities (a local double bridge), re-optimizes around the
+    kick and keeps the result if it is shorter.
+    """
+    def __init__(self, points, max_iterations=100, distance_matrix=None, time_limit=None,
+                 stagnation_limit=None, min_improvement=0.0, initial_solution=None,
+                 num_neighbors=8, max_depth=10, breadth=3, kick_length=30):
+        self.points = points
+        self.num_points = len(points)
+        self.distance_matrix = distance_matrix if distance_matrix is not None else DistanceMatrix(points)
+        self.max_iterations = max_iterations  # Kicks
+        self.stop = StopCondition(time_limit, stagnation_limit, min_improvement)
+        self.initial_solution = initial_solution
+        self.num_neighbors = num_neighbors  # Candidate set size
+        self.max_depth = max_depth  # Longest chain of 2-opt reversals per move
+        self.breadth = breadth  # First steps tried per move
+        self.kick_length = kick_length
+        self.best_solution = None
+        self.best_fitness = float('inf')
+    
+    def local_search(self, route, active=None):
+        """LK moves and Or-opt around the ``active`` cities (all by default)."""
+        return lin_kernighan(route, self.distance_matrix, self.num_neighbors, self.max_depth, self.breadth,
+                             active=active)
+    
+    def kick(self, route):
+        """Route with two adjacent random segments swapped, and the cities next to the cuts."""
+        tour = route[:-1]
+        n = len(tour)
+        first = random.randint(1, min(self.kick_length, (n - 2) // 2))
+        second = random.randint(1, min(self.kick_length, (n - 2) // 2))
+        start = random.randrange(n)
+        
+        # Rotate so the segments follow position 0: a [first] [second] b ...
+        rotated = tour[start:] + tour[:start]
+        end = 1 + first + second
+        kicked = [rotated[0]] + rotated[1 + first:end] + rotated[1:1 + first] + rotated[end:]
+        cuts = [rotated[0], rotated[1], rotated[first], rotated[first + 1], rotated[end - 1], rotated[end]]
+        
+        depot = kicked.index(route[0])
+        return kicked[depot:] + kicked[:depot] + [route[0]], cuts
+    
+    def iterate(self):
+        """Run the search, yielding an incumbent whenever the best solution improves."""
+        start_time = time.time()
+        self.stop.start()
+        
+        with instrumentation.phase('lk.initial_tour'):
+            if self.initial_solution is not None:
+                route = list(self.initial_solution)
+            else:
+                route = nearest_neighbor_tour(self.distance_matrix)
+        with instrumentation.phase('lk.local_search'):
+            route, _ = two_opt(route, self.distance_matrix, self.num_neighbors)
+            self.best_solution, self.best_fitness = self.local_search(route)
+        yield make_incumbent(self.best_solution, self.best_fitness, 0, start_time)
+        
+        if self.num_points < 8:
+            return  # Too small for kicks to find anything new
+        for iteration in range(self.max_iterations):
+            if self.stop.should_stop():
+                break
+            with instrumentation.phase('lk.kick'):
+                kicked, cuts = self.kick(self.best_solution)
+            with instrumentation.phase('lk.local_search'):
+                route, fitness = self.local_search(kicked, cuts)
+            instrumentation.count('lk.kicks')
             
-            # Adaptive parameter adjustment
-            if iteration > 0 and iteration % 5 == 0:
-                # Gradually increase exploitation over exploration
-                self.alpha *= 1.05
-                self.beta *= 1.02
-                self.alpha = min(3.0, self.alpha)  # Cap at 3.0
-                self.beta = min(5.0, self.beta)    # Cap at 5.0
+            if fitness < self.best_fitness - 1e-10:
+                self.best_solution = route
+                self.best_fitness = fitness
+                yield make_incumbent(self.best_solution, self.best_fitness, iteration + 1, start_time)
+            self.stop.update(self.best_fitness)
+    
+    def run(self, callback=None):
+        """Run the search, passing each improved incumbent to ``callback``."""
+        for incumbent in self.iterate():
+            if callback:
+                callback(incumbent)
         
         return self.best_solution, self.best_fitness
 
 # Hybrid SMO-ACO algorithm
 class HybridSMOACO:
-    def __init__(self, points, num_monkeys=20, num_ants=20, max_iterations=25):
+    def __init__(self, points, num_monkeys=20, num_ants=20, max_iterations=25, distance_matrix=None,
+                 time_limit=None, stagnation_limit=None, min_improvement=0.0, initial_solution=None,
+                 local_search='2opt', polish=None, seed_fraction=0.25):
         self.points = points
         self.num_points = len(points)
+        self.distance_matrix = distance_matrix if distance_matrix is not None else DistanceMatrix(points)
         self.max_iterations = max_iterations
+        self.time_limit = time_limit  # Split between the SMO and ACO phases
+        self.local_search_operator = LOCAL_SEARCH_OPERATORS[local_search]  # Also used by the ACO phase
+        # Optional final pass over the result, e.g. 'lk' for Lin-Kernighan moves
+        self.polish_operator = LOCAL_SEARCH_OPERATORS[polish] if polish else None
         self.best_solution = None
         self.best_fitness = float('inf')
         
-        # Initialize SMO and ACO with parameters
-        self.smo = SMO(points, num_monkeys=num_monkeys, max_iterations=max(10, max_iterations//2))
-        self.aco = ACO(points, num_ants=num_ants, max_iterations=max(10, max_iterations//2))
+        # Initialize SMO and ACO with parameters; stagnation is judged per phase
+        # and a warm start seeds the SMO population (ACO starts from its result)
+        self.smo = SMO(points, num_monkeys=num_monkeys, max_iterations=max(10, max_iterations//2),
+                       distance_matrix=self.distance_matrix,
+                       stagnation_limit=stagnation_limit, min_improvement=min_improvement,
+                       initial_solution=initial_solution, seed_fraction=seed_fraction)
+        self.aco = ACO(points, num_ants=num_ants, max_iterations=max(10, max_iterations//2),
+                       distance_matrix=self.distance_matrix,
+                       stagnation_limit=stagnation_limit, min_improvement=min_improvement,
+                       local_search=local_search)
     
     def local_search(self, solution):
-        """Apply 2-opt local search to improve a solution."""
-        improved = True
-        best_route = solution.copy()
-        best_distance = calculate_total_distance(best_route, self.points)
-        
-        improvement_count = 0
-        max_improvements = 20  # Limit to avoid excessive time in local search
-        
-        while improved and improvement_count < max_improvements:
-            improved = False
-            for i in range(1, len(best_route) - 2):
-                for j in range(i + 1, len(best_route) - 1):
-                    # Skip if indices are adjacent
-                    if j - i <= 1:
-                        continue
-                    
-                    # Create new route with 2-opt swap
-                    new_route = best_route[:i] + best_route[i:j+1][::-1] + best_route[j+1:]
-                    new_distance = calculate_total_distance(new_route, self.points)
-                    
-                    # Update if better
-                    if new_distance < best_distance:
-                        best_distance = new_distance
-                        best_route = new_route
-                        improved = True
-                        improvement_count += 1
-                        break
-                
-                if improved:
-                    break
-        
-        return best_route, best_distance
+        """Apply the configured local search (2-opt by default) to improve a solution."""
+        return self.local_search_operator(solution, self.distance_matrix)
     
-    def run(self):
-        """Run the hybrid SMO-ACO algorithm with advanced coordination."""
+    def iterate(self):
+        """Run the hybrid SMO-ACO algorithm with advanced coordination,
+        yielding an incumbent whenever the best solution improves."""
         start_time = time.time()
         
-        # Phase 1: Run SMO to get initial solution
-        smo_solution, smo_fitness = self.smo.run()
-        self.best_solution = smo_solution
-        self.best_fitness = smo_fitness
+        # Phase 1: Run SMO to get initial solution, with half of any time budget
+        if self.time_limit is not None:
+            self.smo.stop.time_limit = self.time_limit / 2
+        for incumbent in self.smo.iterate():
+            self.best_solution = incumbent['solution']
+            self.best_fitness = incumbent['fitness']
+            yield make_incumbent(self.best_solution, self.best_fitness, incumbent['iteration'], start_time)
+        iteration = self.smo.max_iterations
         
         # Apply local search to SMO solution
-        improved_smo, improved_fitness = self.local_search(smo_solution)
+        with instrumentation.phase('hybrid.local_search'):
+            improved_smo, improved_fitness = self.local_search(self.best_solution)
         if improved_fitness < self.best_fitness:
             self.best_solution = improved_smo
             self.best_fitness = improved_fitness
+            yield make_incumbent(self.best_solution, self.best_fitness, iteration, start_time)
         
         # Initialize ACO pheromones based on SMO solution quality
         # High quality edges get higher initial pheromone
-        edge_frequency = {}
-        
-        # Count frequency of edges in top SMO solutions
-        top_solutions = sorted(self.smo.population, key=lambda x: x['fitness'])[:5]
-        for monkey in top_solutions:
-            solution = monkey['solution']
-            for i in range(len(solution) - 1):
-                edge = (solution[i], solution[i + 1])
-                edge_frequency[edge] = edge_frequency.get(edge, 0) + 1
-        
-        # Initialize pheromones with edge frequency information
-        max_frequency = max(edge_frequency.values()) if edge_frequency else 1
-        for edge, freq in edge_frequency.items():
-            # Scale boost based on frequency and solution quality
-            boost = (freq / max_frequency) * 3.0 + 1.0
-            self.aco.pheromones[edge[0]][edge[1]] *= boost
-        
-        # Phase 2: Run ACO to refine the solution
+        with instrumentation.phase('hybrid.pheromone_seeding'):
+            edge_frequency = {}
+            
+            # Count frequency of edges in top SMO solutions
+            top_solutions, _ = self.smo.top_solutions(5)
+            for solution in top_solutions.tolist():
+                for i in range(len(solution) - 1):
+                    edge = (solution[i], solution[i + 1])
+                    edge_frequency[edge] = edge_frequency.get(edge, 0) + 1
+            
+            # Initialize pheromones with edge frequency information
+            max_frequency = max(edge_frequency.values()) if edge_frequency else 1
+            for edge, freq in edge_frequency.items():
+                # Scale boost based on frequency and solution quality
+                boost = (freq / max_frequency) * 3.0 + 1.0
+                self.aco.pheromones[edge[0]][edge[1]] *= boost
+        
+        # Phase 2: Run ACO to refine the solution with the remaining time;
+        # it only reports solutions better than the one it starts from
+        if self.time_limit is not None:
+            self.aco.stop.time_limit = max(0.0, self.time_limit - (time.time() - start_time))
         self.aco.best_solution = self.best_solution
         self.aco.best_fitness = self.best_fitness
-        aco_solution, aco_fitness = self.aco.run()
+        for incumbent in self.aco.iterate():
+            self.best_solution = incumbent['solution']
+            self.best_fitness = incumbent['fitness']
+            yield make_incumbent(self.best_solution, self.best_fitness,
+                                 iteration + incumbent['iteration'], start_time)
+        iteration += self.aco.max_iterations
         
         # Apply local search to ACO solution
-        improved_aco, improved_aco_fitness = self.local_search(aco_solution)
-        if improved_aco_fitness < aco_fitness:
-            aco_solution = improved_aco
-            aco_fitness = improved_aco_fitness
+        with instrumentation.phase('hybrid.local_search'):
+            improved_aco, improved_aco_fitness = self.local_search(self.best_solution)
+        if improved_aco_fitness < self.best_fitness:
+            self.best_solution = improved_aco
+            self.best_fitness = improved_aco_fitness
+            yield make_incumbent(self.best_solution, self.best_fitness, iteration, start_time)
+        
+        if self.polish_operator:
+            with instrumentation.phase('hybrid.polish'):
+                polished, polished_fitness = self.polish_operator(self.best_solution, self.distance_matrix)
+            if polished_fitness < self.best_fitness:
+                self.best_solution = polished
+                self.best_fitness = polished_fitness
+                yield make_incumbent(self.best_solution, self.best_fitness, iteration, start_time)
+    
+    def run(self, callback=None):
+        """Run the hybrid SMO-ACO algorithm, passing each improved incumbent to ``callback``."""
+        for incumbent in self.iterate():
+            if callback:
+                callback(incumbent)
         
         # Return the best solution from both algorithms
-        if aco_fitness < self.best_fitness:
-            return aco_solution, aco_fitness
-        else:
-            return self.best_solution, self.best_fitness
+        return self.best_solution, self.best_fitness
 
 # Multiple TSP solver using Cluster-First Route-Second approach
-def cluster_and_route(depot, locations, num_salesmen, algorithm='smo-aco'):
-    """Solve mTSP by clustering and then routing."""
+def cluster_and_route(depot, locations, num_salesmen, algorithm='smo-aco', workers=None, seed=None,
+                      prune_margin=None, methods=('angle', 'kmeans', 'capacity'), objective='total',
+                      capacity=None, callback=None, time_limit=None, stagnation_limit=None,
+                      min_improvement=0.0, initial_routes=None, params=None, inter_route=False):
+    """Solve mTSP by clustering the locations, then routing every cluster.
+    
+    Args:
+        workers: processes solving the cluster TSPs of all methods concurrently.
+        seed: derives each cluster's seed, so results do not depend on ``workers``.
+        prune_margin: skip methods whose quick NN + 2-opt estimate is this much above the best.
+        methods: clustering methods to try (see ``CLUSTERING_METHODS``).
+        objective: 'total' distance, or 'minmax' to rebalance and pick by longest route.
+        capacity: maximum stops per salesman (ValueError if too small); overfull clusterings are repaired.
+        callback: receives improved complete solutions ('routes', 'totalDistance', 'stage', 'elapsed').
+        time_limit: seconds for the whole call, shared among the cluster solves.
+        stagnation_limit, min_improvement: solver stopping rule (see StopCondition).
+        initial_routes: previous routes to warm start from (see ``warm_start_clusters``).
+        params: keyword arguments for every cluster's solver (see ``solve_single_tsp``).
+        inter_route: finally move stops between the routes (see ``improve_routes``).
+    """
+    deadline = time.time() + time_limit if time_limit is not None else None
+    if capacity is not None and capacity * max(1, num_salesmen) < len(locations):
+        raise ValueError(f"{len(locations)} locations do not fit {num_salesmen} salesmen "
+                         f"of capacity {capacity}")
+    if initial_routes is not None and stagnation_limit is None:
+        stagnation_limit = WARM_START_STAGNATION  # Warm starts begin near a good solution
+    options = {'stagnation_limit': stagnation_limit, 'min_improvement': min_improvement, 'params': params}
+    if instrumentation.current() is not None:
+        options['profile'] = True  # Cluster solves send their profiles back
+    
+    if seed is not None:
+        random.seed(seed)
+        np.random.seed(seed)
+    
     # Create complete list of points with depot at index 0
     all_points = [depot] + locations
+    # The full matrix is only built when warm starts, capacity, balancing or
+    # inter-route moves need it; cluster solves otherwise get their own
+    distance_matrix = None
     
-    # If only 1 salesman, solve as a single TSP
-    if num_salesmen == 1:
-        solution, fitness = solve_single_tsp(all_points, algorithm)
-        return [{'salesman': 1, 'route': solution}], fitness
+    def full_matrix():
+        nonlocal distance_matrix
+        if distance_matrix is None:
+            distance_matrix = DistanceMatrix(all_points)
+        return distance_matrix
     
-    # Try different clustering methods and pick the best
-    methods = [
-        ('angle', cluster_by_angle),
-        ('kmeans', cluster_by_kmeans)
-    ]
+    if initial_routes is not None:
+        # Keep the previous assignment; clusters list stops in visiting order
+        with instrumentation.phase('clustering.warm_start'):
+            orders = warm_start_clusters(initial_routes, num_salesmen, full_matrix())
+        clusters = [[stop - 1 for stop in order] for order in orders]
+        if capacity is not None:
+            clusters = enforce_capacity(clusters, full_matrix(), capacity)
+        clusterings = [clusters]
+    elif num_salesmen == 1:
+        # Only 1 salesman: solve as a single TSP over all locations
+        clusterings = [[list(range(len(locations)))]]
+    else:
+        # Try different clustering methods and pick the best
+        # Cluster with every method up front, so the random state seen by the
+        # clustering does not depend on how the cluster solves are scheduled
+        clusterings = []
+        for method_name in methods:
+            with instrumentation.phase(f'clustering.{method_name}'):
+                if method_name == 'capacity':
+                    clusters = cluster_by_capacity(depot, locations, num_salesmen, capacity=capacity)
+                elif method_name == 'kmeans' and len(locations) > KMEANS_BATCH_THRESHOLD:
+                    clusters = cluster_by_kmeans(depot, locations, num_salesmen, batch_size=KMEANS_BATCH_SIZE)
+                else:
+                    clusters = CLUSTERING_METHODS[method_name](depot, locations, num_salesmen)
+            if capacity is not None:
+                clusters = enforce_capacity(clusters, full_matrix(), capacity)
+            if objective == 'minmax':
+                with instrumentation.phase('clustering.balance'):
+                    clusters = balance_route_lengths(clusters, full_matrix(), capacity=capacity)
+            clusterings.append(clusters)
     
-    best_routes = None
-    best_distance = float('inf')
+    parallel = bool(workers and workers > 1)
     
-    for method_name, cluster_function in methods:
-        clusters = cluster_function(depot, locations, num_salesmen)
-        
-        # Step 2: Solve TSP for each cluster
-        routes = []
-        total_distance = 0
-        
+    candidates = []
+    for method_index, clusters in enumerate(clusterings):
+        tasks = []
         for i, cluster in enumerate(clusters):
-            # Skip empty clusters
-            if not cluster:
+            # Skip empty clusters (a lone salesman still gets a depot round trip)
+            if not cluster and num_salesmen > 1:
                 continue
-                
+            
             # Add depot to each cluster
             cluster_points = [depot] + [locations[j] for j in cluster]
             
             # Map original indices
             indices = [0] + [cluster[j] + 1 for j in range(len(cluster))]
+            # The full matrix fits a cluster listing every location in index order;
+            # otherwise slice it if it exists, or compute just the cluster's distances
+            if cluster == list(range(len(locations))):
+                cluster_matrix = full_matrix()
+            elif distance_matrix is not None:
+                cluster_matrix = distance_matrix.subset(indices)
+            else:
+                cluster_matrix = DistanceMatrix(cluster_points)
             
-            # Solve TSP for this cluster
-            solution, fitness = solve_single_tsp(cluster_points, algorithm)
-            
-            # Map solution back to original indices
-            mapped_solution = [indices[j] for j in solution]
+            # A warm-started cluster is already in visiting order
+            task_options = options
+            if initial_routes is not None:
+                task_options = dict(options, initial_solution=list(range(len(indices))) + [0])
             
-            routes.append({
-                'salesman': i + 1,
-                'route': mapped_solution
-            })
-            total_distance += fitness
+            tasks.append((i, indices, (cluster_points, algorithm, cluster_matrix,
+                                       _cluster_seed(seed, method_index, i, parallel), task_options)))
+        candidates.append(tasks)
+    
+    # Quick routes per cluster, for pruning and as the first streamed solution
+    quick = None
+    if callback or (prune_margin is not None and len(candidates) > 1):
+        with instrumentation.phase('quick_routes'):
+            quick = [[_quick_route(task[2], task[4].get('initial_solution')) for _, _, task in tasks]
+                     for tasks in candidates]
+    
+    # Drop clusterings that cannot plausibly beat the best estimate
+    if prune_margin is not None and len(candidates) > 1:
+        # Estimated score as used to pick the winner, margin on its first part
+        estimates = [max((length for _, length in routes), default=0.0) if objective == 'minmax'
+                     else sum(length for _, length in routes) for routes in quick]
+        cutoff = min(estimates) * (1 + prune_margin)
+        keep = [estimate <= cutoff for estimate in estimates]
+        candidates = [tasks for tasks, kept in zip(candidates, keep) if kept]
+        quick = [routes for routes, kept in zip(quick, keep) if kept]
+    
+    # Best known route per cluster of every candidate, when streaming
+    tracker = None
+    if callback:
+        tracker = _IncumbentTracker(callback, objective)
+        current = [[([indices[j] for j in route], length) for (_, indices, _), (route, length) in zip(tasks, routes)]
+                   for tasks, routes in zip(candidates, quick)]
+        for c, tasks in enumerate(candidates):
+            tracker.offer(tasks, current[c], 'initial')
+    
+    def improve(c, k, solution, fitness, stage):
+        """Record a new route for cluster ``k`` of candidate ``c`` if it is better."""
+        if fitness < current[c][k][1]:
+            indices = candidates[c][k][1]
+            current[c][k] = ([indices[j] for j in solution], fitness)
+            tracker.offer(candidates[c], current[c], stage)
+    
+    best_routes = None
+    best_distance = float('inf')
+    best_score = None
+    best_tasks = None
+    
+    # Step 2: Solve TSP for each cluster of every remaining method, in
+    # parallel if a pool is available
+    flat = [(c, k, task) for c, tasks in enumerate(candidates) for k, (_, _, task) in enumerate(tasks)]
+    pool = ProcessPoolExecutor(max_workers=workers) if parallel and len(flat) > 1 else None
+    try:
+        if pool:
+            slots = min(workers, len(flat))
+            results = pool.map(_solve_cluster, [_with_time_share(task, deadline, len(flat), slots)
+                                                for _, _, task in flat])
+        else:
+            # Budgets are computed as each solve starts, from the time left
+            def cluster_callback(c, k):
+                if tracker is None:
+                    return None
+                return lambda incumbent: improve(c, k, incumbent['solution'], incumbent['fitness'], 'improving')
+            results = (_solve_cluster(_with_time_share(task, deadline, len(flat) - n, 1), cluster_callback(c, k))
+                       for n, (c, k, task) in enumerate(flat))
         
-        # Keep the best clustering method
-        if total_distance < best_distance:
-            best_distance = total_distance
-            best_routes = routes
+        for c, tasks in enumerate(candidates):
+            routes = []
+            total_distance = 0
+            longest = 0
+            for k, (i, indices, _) in enumerate(tasks):
+                solution, fitness, worker_profile = next(results)
+                if worker_profile:
+                    instrumentation.current().merge(worker_profile)
+                
+                # Map solution back to original indices
+                mapped_solution = [indices[j] for j in solution]
+                
+                if tracker:
+                    improve(c, k, solution, fitness, 'improving')
+                    mapped_solution, fitness = current[c][k]
+                
+                routes.append({
+                    'salesman': i + 1,
+                    'route': mapped_solution
+                })
+                total_distance += fitness
+                longest = max(longest, fitness)
+            
+            # Keep the best clustering method
+            score = (longest, total_distance) if objective == 'minmax' else (total_distance,)
+            if best_score is None or score < best_score:
+                best_score = score
+                best_distance = total_distance
+                best_routes = routes
+                best_tasks = tasks
+    finally:
+        if pool:
+            pool.shutdown()
+    
+    # Step 3: Move stops between the routes of the best clustering
+    if inter_route and len(best_routes) > 1:
+        with instrumentation.phase('inter_route'):
+            improved, lengths = improve_routes([route['route'] for route in best_routes], full_matrix(),
+                                               objective=objective, capacity=capacity)
+        score = (max(lengths), sum(lengths)) if objective == 'minmax' else (sum(lengths),)
+        if score < best_score:
+            best_routes = [dict(route, route=new_route) for route, new_route in zip(best_routes, improved)]
+            best_distance = sum(lengths)
+            if tracker:
+                tracker.offer(best_tasks, list(zip(improved, lengths)), 'inter_route')
     
     return best_routes, best_distance
 
-def cluster_by_angle(depot, locations, num_clusters):
-    """Cluster points based on their angle from the depot."""
-    # Calculate angle of each point relative to depot
-    angles = []
-    for i, point in enumerate(locations):
-        dx = point['lng'] - depot['lng']
-        dy = point['lat'] - depot['lat']
-        angle = math.atan2(dy, dx)
-        angles.append((i, angle))
+class _IncumbentTracker:
+    """Reports complete mTSP solutions to a callback whenever one beats all earlier ones."""
+    def __init__(self, callback, objective):
+        self.callback = callback
+        self.objective = objective
+        self.best_score = None
+        self.start_time = time.time()
     
-    # Sort points by angle
-    angles.sort(key=lambda x: x[1])
+    def offer(self, tasks, routes, stage):
+        """Report the solution made of one ``(route, length)`` per cluster task if it is the best so far."""
+        lengths = [length for _, length in routes]
+        total = sum(lengths)
+        score = (max(lengths, default=0), total) if self.objective == 'minmax' else (total,)
+        if self.best_score is not None and score >= self.best_score:
+            return
+        self.best_score = score
+        self.callback({
+            'routes': [{'salesman': i + 1, 'route': route} for (i, _, _), (route, _) in zip(tasks, routes)],
+            'totalDistance': total,
+            'stage': stage,
+            'elapsed': time.time() - self.start_time
+        })
+
+def _quick_route(distance_matrix, initial_solution=None):
+    """Nearest-neighbor tour (or ``initial_solution``) improved with 2-opt, and its length."""
+    if initial_solution is None:
+        initial_solution = nearest_neighbor_tour(distance_matrix)
+    return two_opt(initial_solution, distance_matrix)
+
+def warm_start_clusters(routes, num_salesmen, distance_matrix):
+    """Stops of each salesman, in visiting order, taken from a previous solution.
     
-    # Distribute points evenly among clusters
-    clusters = [[] for _ in range(num_clusters)]
-    for i, (idx, _) in enumerate(angles):
-        clusters[i % num_clusters].append(idx)
+    ``routes`` index the depot (0) and locations (1..n) of ``distance_matrix``
+    and are either plain lists or dicts with a 'route', as returned by
+    ``solve_mtsp``. Unknown and repeated stops are dropped, routes beyond
+    ``num_salesmen`` are appended to the last one, and locations missing
+    from every route are inserted after their nearest routed stop, so the
+    result covers every location exactly once.
+    """
+    num_locations = len(distance_matrix) - 1
+    orders = [[] for _ in range(max(1, num_salesmen))]
+    seen = set()
+    for k, route in enumerate(routes):
+        if isinstance(route, dict):
+            route = route['route']
+        order = orders[min(k, len(orders) - 1)]
+        for stop in route:
+            stop = int(stop)
+            if 1 <= stop <= num_locations and stop not in seen:
+                seen.add(stop)
+                order.append(stop)
     
-    return clusters
+    for stop in range(1, num_locations + 1):
+        if stop in seen:
+            continue
+        routed = [(distance_matrix.matrix[stop, other], k, position)
+                  for k, order in enumerate(orders) for position, other in enumerate(order)]
+        if routed:
+            _, k, position = min(routed)
+            orders[k].insert(position + 1, stop)
+        else:
+            orders[0].append(stop)
+        seen.add(stop)
+    return orders
+
+def estimate_route_length(distance_matrix):
+    """Cheap route length estimate: nearest-neighbor tour plus 2-opt."""
+    return _quick_route(distance_matrix)[1]
+
+def _cluster_seed(seed, method_index, cluster_index, parallel):
+    """Random seed for one cluster sub-problem.
+    
+    Derived deterministically from ``seed`` when given. Without a seed,
+    pooled workers still need distinct seeds, as forked processes inherit
+    identical random state; sequential solves keep the shared generator.
+    """
+    if seed is not None:
+        return int(np.random.SeedSequence([seed, method_index, cluster_index]).generate_state(1)[0])
+    if parallel:
+        return random.randrange(2**32)
+    return None
 
-def cluster_by_kmeans(depot, locations, num_clusters):
-    """Cluster points using K-means."""
+def _with_time_share(task, deadline, remaining_tasks, slots):
+    """The cluster task with its share of the time left before ``deadline``."""
+    if deadline is None:
+        return task
+    points, algorithm, distance_matrix, seed, options = task
+    time_limit = max(0.0, deadline - time.time()) * slots / remaining_tasks
+    return points, algorithm, distance_matrix, seed, dict(options, time_limit=time_limit)
+
+def _solve_cluster(task, callback=None):
+    """Solve one cluster's TSP; module level so it can run in a worker process.
+    
+    Returns the route, its length and, when profiling, the profile of this
+    solve as a dict for the caller to merge (None otherwise). A fresh
+    profile is used even in-process, since forked workers inherit a copy of
+    the parent's active one.
+    """
+    points, algorithm, distance_matrix, seed, options = task
+    if seed is not None:
+        random.seed(seed)
+        np.random.seed(seed)
+    options = dict(options)
+    if options.pop('profile', False):
+        profile = instrumentation.Profile()
+        with profile.activate():
+            solution, fitness = solve_single_tsp(points, algorithm, distance_matrix, callback, **options)
+        return solution, fitness, profile.to_dict()
+    return solve_single_tsp(points, algorithm, distance_matrix, callback, **options) + (None,)
+
+def cluster_by_angle(depot, locations, num_clusters):
+    """Cluster points based on their angle from the depot.
+    
+    Points are swept in angular order, starting after the widest empty
+    sector, and cut into contiguous sectors of (nearly) equal size.
+    """
     if not locations:
         return [[] for _ in range(num_clusters)]
     
-    # Extract coordinates
-    coords = [[loc['lat'], loc['lng']] for loc in locations]
+    # Calculate angle of each point relative to depot
+    coords = np.array([[point['lng'] - depot['lng'], point['lat'] - depot['lat']] for point in locations])
+    angles = np.arctan2(coords[:, 1], coords[:, 0])
     
-    # Simple K-means implementation
-    # Initialize centroids randomly
-    centroids = []
-    for _ in range(num_clusters):
-        idx = random.randint(0, len(coords) - 1)
-        centroids.append(coords[idx])
+    # Sort points by angle, starting the sweep after the largest gap
+    order = np.argsort(angles, kind='stable')
+    sorted_angles = angles[order]
+    gaps = np.diff(np.append(sorted_angles, sorted_angles[0] + 2 * math.pi))
+    order = np.roll(order, -(int(np.argmax(gaps)) + 1))
     
-    # Iterate until convergence or max iterations
-    max_iter = 10
+    # Cut the sweep into contiguous sectors
+    return [sector.tolist() for sector in np.array_split(order, num_clusters)]
+
+def cluster_by_capacity(depot, locations, num_clusters, capacity=None, max_iter=20):
+    """Cluster points using K-means with a cap on the points per cluster.
+    
+    Points are assigned in order of regret (how much farther their second
+    choice is than their first) to the nearest centroid with room left.
+    ``capacity`` defaults to an even share and is raised to at least that
+    much so that every point fits.
+    """
+    if not locations:
+        return [[] for _ in range(num_clusters)]
+    
+    coords = np.array([[loc['lat'], loc['lng']] for loc in locations], dtype=float)
+    coords -= coords.mean(axis=0)
+    k = min(num_clusters, len(coords))
+    share = -(-len(coords) // k)
+    capacity = max(capacity or share, share)
+    
+    centroids = _kmeans_plus_plus(coords, k)
+    labels = None
     for _ in range(max_iter):
-        # Assign points to clusters
-        clusters = [[] for _ in range(num_clusters)]
-        
-        for i, point in enumerate(coords):
-            # Find closest centroid
-            min_dist = float('inf')
-            closest = 0
-            
-            for j, centroid in enumerate(centroids):
-                dist = (point[0] - centroid[0])**2 + (point[1] - centroid[1])**2
-                if dist < min_dist:
-                    min_dist = dist
-                    closest = j
-                    
-            clusters[closest].append(i)
-        
-        # Update centroids
-        new_centroids = []
-        for cluster in clusters:
-            if not cluster:  # Empty cluster
-                if centroids:
-                    new_centroids.append(centroids[0])  # Just use first centroid
-                else:
-                    new_centroids.append([0, 0])
-                continue
-                
-            # Calculate mean position
-            lat_sum = sum(coords[idx][0] for idx in cluster)
-            lng_sum = sum(coords[idx][1] for idx in cluster)
-            new_centroids.append([lat_sum / len(cluster), lng_sum / len(cluster)])
+        _, sq_dists = _kmeans_assign(coords, centroids)
+        new_labels = _capacitated_assign(sq_dists, capacity)
         
         # Check convergence
-        converged = True
-        for i in range(len(centroids)):
-            if abs(centroids[i][0] - new_centroids[i][0]) > 0.001 or \
-               abs(centroids[i][1] - new_centroids[i][1]) > 0.001:
-                converged = False
+        if labels is not None and np.array_equal(labels, new_labels):
+            break
+        labels = new_labels
+        
+        # Update centroids of non-empty clusters
+        counts = np.bincount(labels, minlength=k)
+        filled = counts > 0
+        centroids[filled] = _kmeans_sums(coords, labels, k)[filled] / counts[filled, None]
+    
+    clusters = [np.flatnonzero(labels == j).tolist() for j in range(k)]
+    return clusters + [[] for _ in range(num_clusters - k)]
+
+def _capacitated_assign(sq_dists, capacity):
+    """Assign points to their nearest centroid that still has capacity, most constrained points first."""
+    n, k = sq_dists.shape
+    preferences = np.argsort(sq_dists, axis=1)
+    if k > 1:
+        ranked = np.take_along_axis(sq_dists, preferences[:, :2], axis=1)
+        order = np.argsort(ranked[:, 0] - ranked[:, 1], kind='stable')  # Largest regret first
+    else:
+        order = np.arange(n)
+    
+    labels = np.empty(n, dtype=np.intp)
+    load = [0] * k
+    for i in order.tolist():
+        for c in preferences[i].tolist():
+            if load[c] < capacity:
+                labels[i] = c
+                load[c] += 1
                 break
-                
-        centroids = new_centroids
+    return labels
+
+def enforce_capacity(clusters, distance_matrix, capacity):
+    """Move stops out of clusters holding more than ``capacity`` stops.
+    
+    ``distance_matrix`` is indexed as in ``balance_route_lengths``. Each
+    moved stop is the one of an overfull cluster that lies closest to a
+    stop of a cluster with room left, and joins that cluster.
+    """
+    clusters = [list(cluster) for cluster in clusters]
+    while True:
+        over = [c for c, cluster in enumerate(clusters) if len(cluster) > capacity]
+        if not over:
+            return clusters
+        source = clusters[over[0]]
+        open_clusters = [c for c, cluster in enumerate(clusters) if len(cluster) < capacity]
+        if not open_clusters:
+            raise ValueError(f"{sum(map(len, clusters))} stops do not fit {len(clusters)} routes "
+                             f"of {capacity} stops")
+        
+        targets, owners = [], []
+        for c in open_clusters:
+            for j in clusters[c] or [-1]:  # An empty cluster is reached from the depot
+                targets.append(j + 1)
+                owners.append(c)
+        rows = distance_matrix.matrix[np.ix_(np.array(source) + 1, targets)]
+        idx, target = np.unravel_index(int(np.argmin(rows)), rows.shape)
+        clusters[owners[target]].append(source.pop(int(idx)))
+
+def balance_route_lengths(clusters, distance_matrix, max_moves=50, num_candidates=5, capacity=None):
+    """Move boundary stops out of the longest route while that shortens it.
+    
+    ``distance_matrix`` covers the depot (index 0) and all locations, so
+    location ``j`` is row ``j + 1``. Route lengths are estimated with
+    ``estimate_route_length``; a stop of the longest cluster is moved to the
+    cluster holding its nearest foreign stop when the longer of the two
+    resulting estimates is below the current maximum and the receiving
+    cluster stays within ``capacity`` stops.
+    """
+    clusters = [list(cluster) for cluster in clusters]
+    if sum(1 for cluster in clusters if cluster) < 2:
+        return clusters
+    
+    def estimate(cluster):
+        if not cluster:
+            return 0.0
+        return estimate_route_length(distance_matrix.subset([0] + [j + 1 for j in cluster]))
+    
+    lengths = [estimate(cluster) for cluster in clusters]
+    owner = {j: c for c, cluster in enumerate(clusters) for j in cluster}
+    
+    for _ in range(max_moves):
+        longest = int(np.argmax(lengths))
+        source = clusters[longest]
+        if len(source) < 2:
+            break
+        
+        # Distance from each stop of the longest route to the nearest stop elsewhere
+        others = np.array([j + 1 for j in owner if owner[j] != longest], dtype=np.intp)
+        rows = distance_matrix.matrix[np.ix_(np.array(source) + 1, others)]
+        nearest = others[np.argmin(rows, axis=1)] - 1
+        gaps = rows.min(axis=1)
         
-        if converged:
+        moved = False
+        for idx in np.argsort(gaps)[:num_candidates].tolist():
+            stop, target = source[idx], owner[int(nearest[idx])]
+            if capacity is not None and len(clusters[target]) >= capacity:
+                continue
+            shrunk = [j for j in source if j != stop]
+            grown = clusters[target] + [stop]
+            new_source, new_target = estimate(shrunk), estimate(grown)
+            if max(new_source, new_target) < lengths[longest] - 1e-9:
+                clusters[longest], clusters[target] = shrunk, grown
+                lengths[longest], lengths[target] = new_source, new_target
+                owner[stop] = target
+                moved = True
+                break
+        
+        if not moved:
             break
     
     return clusters
 
-def solve_single_tsp(points, algorithm):
-    """Solve a single TSP instance using the specified algorithm."""
+def cluster_by_kmeans(depot, locations, num_clusters, max_iter=100, batch_size=None):
+    """Cluster points using K-means.
+    
+    Centroids are seeded with k-means++ and refined with vectorized Lloyd
+    iterations, or with mini-batch updates on ``batch_size`` random points
+    per iteration when given. Clusters left empty are re-seeded with the
+    point farthest from its centroid, so every cluster gets at least one
+    point whenever there are enough locations. Lloyd iterations stop once
+    the assignment no longer changes.
+    """
+    if not locations:
+        return [[] for _ in range(num_clusters)]
+    
+    # Extract coordinates, centered to keep the squared distances accurate
+    coords = np.array([[loc['lat'], loc['lng']] for loc in locations], dtype=float)
+    coords -= coords.mean(axis=0)
+    k = min(num_clusters, len(coords))
+    
+    centroids = _kmeans_plus_plus(coords, k)
+    if batch_size and batch_size < len(coords):
+        centroids = _minibatch_kmeans(coords, centroids, batch_size, max_iter)
+        labels, sq_dists = _kmeans_assign(coords, centroids)
+        labels = _kmeans_repair_empty(labels, sq_dists, k)
+    else:
+        labels = None
+        for _ in range(max_iter):
+            new_labels, sq_dists = _kmeans_assign(coords, centroids)
+            new_labels = _kmeans_repair_empty(new_labels, sq_dists, k)
+            
+            # Check convergence
+            if labels is not None and np.array_equal(labels, new_labels):
+                break
+            labels = new_labels
+            
+            # Update centroids to the mean position of their points
+            counts = np.bincount(labels, minlength=k)
+            centroids = _kmeans_sums(coords, labels, k) / counts[:, None]
+    
+    clusters = [np.flatnonzero(labels == j).tolist() for j in range(k)]
+    return clusters + [[] for _ in range(num_clusters - k)]
+
+def _kmeans_plus_plus(coords, k):
+    """Pick ``k`` initial centroids, each with probability proportional to its
+    squared distance from the centroids already chosen."""
+    centroids = np.empty((k, coords.shape[1]))
+    centroids[0] = coords[np.random.randint(len(coords))]
+    sq_dists = ((coords - centroids[0]) ** 2).sum(axis=1)
+    for c in range(1, k):
+        total = sq_dists.sum()
+        if total > 0:
+            idx = np.random.choice(len(coords), p=sq_dists / total)
+        else:
+            idx = np.random.randint(len(coords))  # All remaining points coincide
+        centroids[c] = coords[idx]
+        sq_dists = np.minimum(sq_dists, ((coords - centroids[c]) ** 2).sum(axis=1))
+    return centroids
+
+def _kmeans_assign(coords, centroids):
+    """Index of the closest centroid for every point, and the squared distances to all centroids."""
+    sq_dists = ((coords ** 2).sum(axis=1)[:, None] - 2.0 * coords @ centroids.T
+                + (centroids ** 2).sum(axis=1)[None, :])
+    np.maximum(sq_dists, 0.0, out=sq_dists)
+    return np.argmin(sq_dists, axis=1), sq_dists
+
+def _kmeans_sums(coords, labels, k):
+    """Per-cluster coordinate sums."""
+    return np.stack([np.bincount(labels, weights=coords[:, d], minlength=k)
+                     for d in range(coords.shape[1])], axis=1)
+
+def _kmeans_repair_empty(labels, sq_dists, k):
+    """Give every empty cluster the point farthest from its own centroid,
+    taken from a cluster that keeps at least one other point."""
+    counts = np.bincount(labels, minlength=k)
+    if counts.min() > 0:
+        return labels
+    labels = labels.copy()
+    residual = sq_dists[np.arange(len(labels)), labels]
+    for empty in np.flatnonzero(counts == 0):
+        donors = counts[labels] > 1
+        if not donors.any():
+            break
+        idx = int(np.argmax(np.where(donors, residual, -1.0)))
+        counts[labels[idx]] -= 1
+        counts[empty] += 1
+        labels[idx] = empty
+        residual[idx] = -1.0
+    return labels
+
+def _minibatch_kmeans(coords, centroids, batch_size, max_iter):
+    """Refine centroids with mini-batch k-means using per-centroid learning rates."""
+    centroids = centroids.copy()
+    seen = np.zeros(len(centroids))
+    for _ in range(max_iter):
+        batch = coords[np.random.randint(len(coords), size=batch_size)]
+        labels, _ = _kmeans_assign(batch, centroids)
+        counts = np.bincount(labels, minlength=len(centroids))
+        sums = _kmeans_sums(batch, labels, len(centroids))
+        
+        # Move each centroid towards the mean of its batch points, with a
+        # step that shrinks as the centroid accumulates points
+        seen += counts
+        moved = counts > 0
+        centroids[moved] += (sums[moved] - counts[moved, None] * centroids[moved]) / seen[moved, None]
+    return centroids
+
+# Clustering methods available to cluster_and_route, by name
+CLUSTERING_METHODS = {
+    'angle': cluster_by_angle,
+    'kmeans': cluster_by_kmeans,
+    'capacity': cluster_by_capacity
+}
+
+def solve_single_tsp(points, algorithm, distance_matrix=None, callback=None, time_limit=None,
+                     stagnation_limit=None, min_improvement=0.0, initial_solution=None, params=None):
+    """Solve a single TSP instance using the specified algorithm.
+    
+    ``callback``, if given, receives every improved incumbent of the solver;
+    ``initial_solution`` is a route to warm start from and the stopping
+    arguments set its stopping rule (see StopCondition). ``params`` holds
+    further keyword arguments for the solver class, such as
+    ``num_monkeys`` for SMO, ``alpha`` and ``beta`` for ACO or ``polish``
+    for the hybrid. ``'lk'`` (LinKernighan) scales best to large clusters.
+    """
+    if distance_matrix is None:
+        distance_matrix = DistanceMatrix(points)
+    options = {'time_limit': time_limit, 'stagnation_limit': stagnation_limit,
+               'min_improvement': min_improvement, 'initial_solution': initial_solution}
+    options.update(params or {})
+    callback = instrumentation.traced(callback, algorithm)
+    
     if algorithm == 'smo':
-        solver = SMO(points)
-        solution, fitness = solver.run()
+        solver = SMO(points, distance_matrix=distance_matrix, **options)
+        solution, fitness = solver.run(callback)
     elif algorithm == 'aco':
-        solver = ACO(points)
-        solution, fitness = solver.run()
+        solver = ACO(points, distance_matrix=distance_matrix, **options)
+        solution, fitness = solver.run(callback)
+    elif algorithm == 'lk':
+        solver = LinKernighan(points, distance_matrix=distance_matrix, **options)
+        solution, fitness = solver.run(callback)
     else:  # 'smo-aco' (hybrid)
-        solver = HybridSMOACO(points)
-        solution, fitness = solver.run()
+        solver = HybridSMOACO(points, distance_matrix=distance_matrix, **options)
+        solution, fitness = solver.run(callback)
     
     return solution, fitness
 
-def solve_mtsp(depot, locations, num_salesmen, algorithm='smo-aco'):
-    """Main function to solve mTSP problem."""
+def solve_mtsp(depot, locations, num_salesmen, algorithm='smo-aco', workers=None, seed=None,
+               prune_margin=None, methods=('angle', 'kmeans', 'capacity'), objective='total',
+               capacity=None, callback=None, time_limit=None, stagnation_limit=None,
+               min_improvement=0.0, initial_routes=None, params=None, inter_route=False, profile=False):
+    """Main function to solve mTSP problem.
+    
+    ``callback``, if given, receives improved intermediate solutions;
+    ``time_limit`` (seconds), ``stagnation_limit`` and ``min_improvement``
+    stop the solvers early, ``initial_routes`` (the routes of a previous
+    solution) warm start them, ``params`` configures them and
+    ``inter_route`` moves stops between the finished routes (see
+    ``cluster_and_route``). With ``profile`` the result also holds the
+    solve's phase timers, counters and convergence trace (see
+    ``instrumentation.Profile``).
+    """
     start_time = time.time()
-    routes, total_distance = cluster_and_route(depot, locations, num_salesmen, algorithm)
+    collected = instrumentation.Profile() if profile else None
+    with collected.activate() if collected else nullcontext():
+        routes, total_distance = cluster_and_route(depot, locations, num_salesmen, algorithm,
+                                                   workers=workers, seed=seed, prune_margin=prune_margin,
+                                                   methods=methods, objective=objective, capacity=capacity,
+                                                   callback=callback, time_limit=time_limit,
+                                                   stagnation_limit=stagnation_limit,
+                                                   min_improvement=min_improvement,
+                                                   initial_routes=initial_routes, params=params,
+                                                   inter_route=inter_route)
     
     # Return solution in expected format
-    return {
+    solution = {
         'routes': routes,
         'totalDistance': total_distance,
         'time': time.time() - start_time
     }
+    if collected:
+        solution['profile'] = collected.to_dict()
+    return solution
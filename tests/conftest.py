@@ -0,0 +1,22 @@
+import os
+import random
+import sys
+
+import pytest
+
+# The modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def random_instance():
+    """Factory for a depot and ``num_locations`` stops scattered around it.
+    
+    ``seed`` is a seed or a ``random.Random`` to draw the stops from.
+    """
+    def make(num_locations, seed=0):
+        rng = seed if isinstance(seed, random.Random) else random.Random(seed)
+        depot = {'lat': 12.97, 'lng': 77.59}
+        locations = [{'lat': 12.97 + rng.uniform(-0.1, 0.1), 'lng': 77.59 + rng.uniform(-0.1, 0.1)}
+                     for _ in range(num_locations)]
+        return depot, locations
+    return make
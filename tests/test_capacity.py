@@ -0,0 +1,33 @@
+import pytest
+
+from smo_aco import DistanceMatrix, balance_route_lengths, enforce_capacity, solve_mtsp
+
+@pytest.mark.parametrize('objective', ['total', 'minmax'])
+@pytest.mark.parametrize('seed', range(6))
+def test_every_clustering_method_respects_capacity(random_instance, objective, seed):
+    depot, locations = random_instance(59, seed)
+    for methods in (('angle',), ('kmeans',), ('angle', 'kmeans', 'capacity')):
+        solution = solve_mtsp(depot, locations, 3, 'aco', seed=seed, methods=methods, objective=objective,
+                              capacity=20, params={'max_iterations': 2}, inter_route=True)
+        sizes = [len(route['route']) - 2 for route in solution['routes']]
+        assert max(sizes) <= 20, (methods, sizes)
+        assert sum(sizes) == len(locations)
+
+def test_infeasible_capacity_is_rejected(random_instance):
+    depot, locations = random_instance(31, 0)
+    with pytest.raises(ValueError):
+        solve_mtsp(depot, locations, 3, 'aco', capacity=10, params={'max_iterations': 2})
+
+def test_enforce_capacity_moves_overflow_to_open_clusters(random_instance):
+    depot, locations = random_instance(30, 0)
+    distance_matrix = DistanceMatrix([depot] + locations)
+    clusters = enforce_capacity([list(range(30)), [], []], distance_matrix, 10)
+    assert sorted(len(cluster) for cluster in clusters) == [10, 10, 10]
+    assert sorted(j for cluster in clusters for j in cluster) == list(range(30))
+
+def test_balancing_keeps_within_capacity(random_instance):
+    depot, locations = random_instance(40, 1)
+    distance_matrix = DistanceMatrix([depot] + locations)
+    clusters = [list(range(0, 20)), list(range(20, 40))]
+    balanced = balance_route_lengths(clusters, distance_matrix, capacity=20)
+    assert [len(cluster) for cluster in balanced] == [20, 20]
@@ -0,0 +1,41 @@
+import smo_aco
+
+def test_kmeans_clusters_cover_every_location(random_instance):
+    depot, locations = random_instance(500)
+    for batch_size in (None, 64):
+        clusters = smo_aco.cluster_by_kmeans(depot, locations, 5, batch_size=batch_size)
+        assert sorted(j for cluster in clusters for j in cluster) == list(range(500))
+        assert all(clusters)
+
+def test_large_instances_use_mini_batch_kmeans(random_instance, monkeypatch):
+    batch_sizes = []
+    cluster_by_kmeans = smo_aco.cluster_by_kmeans
+    
+    def recording(*args, **kwargs):
+        batch_sizes.append(kwargs.get('batch_size'))
+        return cluster_by_kmeans(*args, **kwargs)
+    
+    monkeypatch.setattr(smo_aco, 'cluster_by_kmeans', recording)
+    monkeypatch.setattr(smo_aco, 'KMEANS_BATCH_THRESHOLD', 50)
+    for num_locations in (40, 60):
+        smo_aco.cluster_and_route(*random_instance(num_locations), 2, 'lk', seed=0, methods=('kmeans',),
+                                  params={'max_iterations': 1})
+    # Smaller instances run full Lloyd iterations through CLUSTERING_METHODS
+    assert batch_sizes == [smo_aco.KMEANS_BATCH_SIZE]
+
+def test_full_matrix_is_built_only_when_needed(random_instance, monkeypatch):
+    sizes = []
+    distance_matrix = smo_aco.DistanceMatrix
+    
+    def recording(points=None, matrix=None):
+        if points is not None:
+            sizes.append(len(points))
+        return distance_matrix(points, matrix)
+    
+    monkeypatch.setattr(smo_aco, 'DistanceMatrix', recording)
+    depot, locations = random_instance(60)
+    for inter_route in (False, True):
+        sizes.clear()
+        smo_aco.cluster_and_route(depot, locations, 3, 'aco', seed=0, methods=('angle',),
+                                  params={'max_iterations': 1}, inter_route=inter_route)
+        assert (len(locations) + 1 in sizes) == inter_route, sizes
@@ -0,0 +1,19 @@
+import numpy as np
+
+import smo_aco
+
+def random_matrix(random_instance, num_points):
+    depot, locations = random_instance(num_points - 1)
+    return smo_aco.DistanceMatrix([depot] + locations)
+
+def test_blockwise_neighbors_match_a_full_sort(random_instance, monkeypatch):
+    monkeypatch.setattr(smo_aco, 'DISTANCE_BLOCK_ROWS', 7)
+    distance_matrix = random_matrix(random_instance, 50)
+    masked = distance_matrix.matrix + np.diag(np.full(50, np.inf))
+    assert distance_matrix.neighbors(5) == np.argsort(masked, axis=1)[:, :5].tolist()
+
+def test_large_matrices_are_not_copied_into_lists(random_instance, monkeypatch):
+    monkeypatch.setattr(smo_aco, 'DISTANCE_ROWS_LIMIT', 20)
+    assert isinstance(random_matrix(random_instance, 20).rows, list)
+    distance_matrix = random_matrix(random_instance, 21)
+    assert distance_matrix.rows is distance_matrix.matrix
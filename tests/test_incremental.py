@@ -0,0 +1,21 @@
+import pytest
+
+from incremental import RouteEditor, update_routes
+
+DEPOT = {'lat': 12.97, 'lng': 77.59}
+LOCATIONS = [{'lat': 12.97 + 0.01 * i, 'lng': 77.59 + 0.01 * (i % 3)} for i in range(1, 7)]
+ROUTES = [[0, 1, 2, 3, 0], [0, 4, 5, 6, 0]]
+
+def test_insert_pinned_to_a_salesman():
+    editor = RouteEditor(DEPOT, LOCATIONS, ROUTES)
+    stop = editor.insert({'lat': 12.975, 'lng': 77.595}, salesman=2)
+    assert stop in editor.routes[1]
+
+@pytest.mark.parametrize('salesman', [0, -1, 3, 1.5, '1'])
+def test_invalid_salesman_is_rejected(salesman):
+    with pytest.raises(ValueError):
+        update_routes(DEPOT, LOCATIONS, ROUTES,
+                      [{'op': 'insert', 'location': {'lat': 13.0, 'lng': 77.6}, 'salesman': salesman}])
+    with pytest.raises(ValueError):
+        update_routes(DEPOT, LOCATIONS, ROUTES,
+                      [{'op': 'move', 'stop': 2, 'location': {'lat': 13.0, 'lng': 77.6}, 'salesman': salesman}])
@@ -0,0 +1,59 @@
+import os
+import time
+
+from jobs import JobQueue
+
+def job_params(random_instance, num_locations, **params):
+    depot, locations = random_instance(num_locations)
+    return dict(params, depot=depot, locations=locations, num_salesmen=3, algorithm='aco', seed=0)
+
+def group_size(pgid):
+    """Number of live processes in a process group (Linux /proc)."""
+    size = 0
+    for pid in os.listdir('/proc'):
+        if not pid.isdigit():
+            continue
+        try:
+            with open(f'/proc/{pid}/stat') as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # Fields after the command name: state, ppid, pgrp, ...
+        if int(stat.rsplit(')', 1)[1].split()[2]) == pgid:
+            size += 1
+    return size
+
+def group_alive(pgid):
+    try:
+        os.killpg(pgid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+
+def test_solve_job_finishes(random_instance):
+    queue = JobQueue(max_workers=1)
+    job = queue.submit(job_params(random_instance, 20, params={'max_iterations': 3}))
+    job = queue.wait(job.id, 60)
+    assert job.status == 'done'
+    assert len(job.result['routes']) == 3
+
+def test_cancel_stops_the_solve_and_its_pool_workers(random_instance):
+    queue = JobQueue(max_workers=1)
+    job = queue.submit(job_params(random_instance, 300, workers=2, params={'max_iterations': 500}))
+    deadline = time.time() + 30
+    while job.process is None and time.time() < deadline:
+        time.sleep(0.05)
+    pid = job.process.pid
+    # Wait for the pool: the solve, resource tracker, forkserver and two workers
+    while group_size(pid) < 5 and time.time() < deadline:
+        time.sleep(0.05)
+    assert group_size(pid) >= 5
+    
+    assert queue.cancel(job.id)
+    assert job.future.exception(timeout=30) is None
+    assert job.status == 'cancelled'
+    
+    deadline = time.time() + 10
+    while group_alive(pid) and time.time() < deadline:
+        time.sleep(0.05)
+    assert not group_alive(pid)
@@ -0,0 +1,94 @@
+import random
+
+import numpy as np
+import pytest
+
+from smo_aco import SMO, DistanceMatrix, solve_mtsp
+from local_search import LOCAL_SEARCH_OPERATORS, improve_routes
+
+def assert_valid_route(route, cities):
+    assert route[0] == route[-1] == cities[0]
+    assert sorted(route[:-1]) == sorted(cities)
+
+@pytest.mark.parametrize('name', sorted(LOCAL_SEARCH_OPERATORS))
+def test_operators_keep_valid_routes_and_never_lengthen_them(random_instance, name):
+    operator = LOCAL_SEARCH_OPERATORS[name]
+    rng = random.Random(name)
+    for _ in range(25):
+        num_points = rng.randint(1, 80)
+        depot, locations = random_instance(num_points - 1, rng)
+        distance_matrix = DistanceMatrix([depot] + locations)
+        # Routes over a subset of the matrix, as for clusters sharing one
+        cities = [0] + rng.sample(range(1, num_points), rng.randint(0, num_points - 1))
+        route = cities[:1] + rng.sample(cities[1:], len(cities) - 1) + cities[:1]
+        
+        improved, length = operator(route, distance_matrix)
+        assert_valid_route(improved, cities)
+        assert length == pytest.approx(distance_matrix.route_length(improved))
+        assert length <= distance_matrix.route_length(route) + 1e-9
+
+@pytest.mark.parametrize('objective', ['total', 'minmax'])
+def test_inter_route_moves_keep_valid_routes(random_instance, objective):
+    rng = random.Random(objective)
+    for _ in range(20):
+        num_points = rng.randint(3, 90)
+        depot, locations = random_instance(num_points - 1, rng)
+        distance_matrix = DistanceMatrix([depot] + locations)
+        num_routes = rng.randint(2, 5)
+        stops = rng.sample(range(1, num_points), num_points - 1)
+        routes = [[0] + stops[k::num_routes] + [0] for k in range(num_routes)]
+        capacity = rng.choice([None, max(len(route) - 2 for route in routes) + 1])
+        
+        improved, lengths = improve_routes(routes, distance_matrix, objective=objective, capacity=capacity)
+        assert sorted(stop for route in improved for stop in route[1:-1]) == list(range(1, num_points))
+        assert all(route[0] == route[-1] == 0 for route in improved)
+        assert lengths == pytest.approx([distance_matrix.route_length(route) for route in improved])
+        if capacity is not None:
+            assert all(len(route) - 2 <= capacity for route in improved)
+        before = [distance_matrix.route_length(route) for route in routes]
+        if objective == 'total':
+            assert sum(lengths) <= sum(before) + 1e-9
+        else:
+            assert max(lengths) <= max(before) + 1e-9
+            if max(lengths) >= max(before) - 1e-9:
+                assert sum(lengths) <= sum(before) + 1e-9
+
+def test_batched_crossover_matches_permutations(random_instance):
+    rng = random.Random(0)
+    np.random.seed(0)
+    random.seed(0)
+    for num_points in (2, 3, 4, 30):
+        depot, locations = random_instance(num_points - 1, rng)
+        smo = SMO([depot] + locations, num_monkeys=12)
+        current = smo.random_solutions(12)
+        leaders = smo.random_solutions(12)
+        offspring = smo.create_new_solutions(current, leaders)
+        for row in offspring.tolist():
+            assert row[0] == row[-1] == 0
+            assert sorted(row[:-1]) == list(range(num_points))
+
+def test_streamed_solutions_match_the_result(random_instance):
+    depot, locations = random_instance(69, seed=1)
+    events = []
+    solution = solve_mtsp(depot, locations, 3, 'aco', seed=0, callback=events.append,
+                          params={'max_iterations': 5}, inter_route=True)
+    distance_matrix = DistanceMatrix([depot] + locations)
+    for event in events:
+        measured = sum(distance_matrix.route_length(route['route']) for route in event['routes'])
+        assert event['totalDistance'] == pytest.approx(measured)
+    assert [event['totalDistance'] for event in events] == sorted(event['totalDistance'] for event in events)[::-1]
+    assert solution['totalDistance'] <= events[-1]['totalDistance'] + 1e-9
+
+@pytest.mark.parametrize('seed', range(8))
+def test_inter_route_never_worsens_the_minmax_score(random_instance, seed):
+    depot, locations = random_instance(59, seed)
+    distance_matrix = DistanceMatrix([depot] + locations)
+    
+    def score(solution):
+        lengths = [distance_matrix.route_length(route['route']) for route in solution['routes']]
+        return max(lengths), sum(lengths)
+    
+    scores = [score(solve_mtsp(depot, locations, 4, 'aco', seed=seed, objective='minmax',
+                               params={'max_iterations': 3}, inter_route=inter_route))
+              for inter_route in (False, True)]
+    assert scores[1] <= (scores[0][0] + 1e-9, scores[0][1] + 1e-9)
@@ -0,0 +1,30 @@
+import pytest
+
+from smo_aco import DistanceMatrix, solve_mtsp
+
+def measured_distance(depot, locations, solution):
+    distance_matrix = DistanceMatrix([depot] + locations)
+    return sum(distance_matrix.route_length(route['route']) for route in solution['routes'])
+
+@pytest.mark.parametrize('algorithm', ['smo', 'aco', 'smo-aco', 'lk'])
+@pytest.mark.parametrize('num_salesmen', [1, 3])
+def test_warm_start_reports_the_returned_routes(random_instance, algorithm, num_salesmen):
+    depot, locations = random_instance(60, seed=1)
+    params = {'max_iterations': 5}
+    cold = solve_mtsp(depot, locations, num_salesmen, algorithm, seed=0, params=params)
+    warm = solve_mtsp(depot, locations, num_salesmen, algorithm, seed=0, params=params,
+                      initial_routes=cold['routes'])
+    
+    stops = sorted(stop for route in warm['routes'] for stop in route['route'][1:-1])
+    assert stops == list(range(1, len(locations) + 1))
+    assert warm['totalDistance'] == pytest.approx(measured_distance(depot, locations, warm))
+    assert warm['totalDistance'] <= cold['totalDistance'] + 1e-6
+
+def test_warm_start_from_a_single_route(random_instance):
+    # Every stop on one route: the cluster is a permutation of all locations
+    depot, locations = random_instance(80, seed=2)
+    cold = solve_mtsp(depot, locations, 1, 'aco', seed=0, params={'max_iterations': 5})
+    merged = [0] + [stop for route in cold['routes'] for stop in route['route'][1:-1]] + [0]
+    warm = solve_mtsp(depot, locations, 2, 'aco', seed=0, params={'max_iterations': 5},
+                      initial_routes=[merged])
+    assert warm['totalDistance'] == pytest.approx(measured_distance(depot, locations, warm))
@@ -0,0 +1,108 @@
+import itertools
+import math
+import time
+
+from batch import solve_batch
+
+# Parameter tuning for the solvers by racing. Every configuration of a grid
+# is scored on a few seeds, the worse ones are dropped and the survivors are
+# scored on more seeds (successive halving), so most solves are spent on
+# the promising configurations. Solves run in parallel across processes.
+
+# Default search space per algorithm, as solver keyword arguments
+PARAMETER_GRIDS = {
+    'smo': {
+        'num_monkeys': [10, 20, 30],
+        'max_iterations': [30, 50, 70]
+    },
+    'aco': {
+        'num_ants': [10, 20, 30],
+        'alpha': [0.5, 1.0, 1.5],
+        'beta': [1.0, 2.0, 3.0]
+    },
+    'smo-aco': {
+        'num_monkeys': [10, 20],
+        'num_ants': [10, 20],
+        'max_iterations': [15, 25]
+    },
+    'lk': {
+        'num_neighbors': [5, 8, 12],
+        'max_depth': [5, 10, 20]
+    }
+}
+
+def configurations(grid):
+    """Every combination of the values in ``grid`` (name -> list of values)."""
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+def tune(depot, locations, num_salesmen, algorithm, grid=None, max_seeds=9, eta=3, seed=0,
+         workers=None, time_limit=None):
+    """Find the solver parameters giving the shortest routes on an instance.
+    
+    Configurations of ``grid`` (``PARAMETER_GRIDS[algorithm]`` by default)
+    race by successive halving: each round scores the survivors on ``eta``
+    times as many seeds as the last, all configurations on the same seeds,
+    and keeps the best ``1/eta`` of them by mean total distance, until one
+    is left or ``max_seeds`` seeds have been used. Every solve routes only
+    the most promising clustering and may be bounded by ``time_limit``
+    seconds; ``workers`` processes run them (all cores by default).
+    
+    Returns the winning 'params' with its mean 'totalDistance' over its
+    'seeds', the number of solves ('evaluations') and the size of each round.
+    """
+    start_time = time.time()
+    candidates = configurations(grid or PARAMETER_GRIDS[algorithm])
+    seeds = [seed + i for i in range(max_seeds)]
+    distances = [[] for _ in candidates]
+    
+    def mean_distance(c):
+        return sum(distances[c]) / len(distances[c])
+    
+    alive = list(range(len(candidates)))
+    num_seeds = 1
+    evaluations = 0
+    rounds = []
+    while True:
+        # Only seeds a survivor has not been scored on yet are solved
+        instances = [{
+            'id': c,
+            'depot': depot,
+            'locations': locations,
+            'num_salesmen': num_salesmen,
+            'algorithm': algorithm,
+            'seed': s,
+            'prune_margin': 0.0,
+            'time_limit': time_limit,
+            'params': candidates[c]
+        } for c in alive for s in seeds[len(distances[c]):num_seeds]]
+        
+        for result in solve_batch(instances, workers=workers):
+            if 'error' in result:
+                raise RuntimeError(f"Solving with {candidates[result['id']]} failed: {result['error']}")
+            distances[result['id']].append(result['totalDistance'])
+        evaluations += len(instances)
+        
+        alive.sort(key=mean_distance)
+        rounds.append({
+            'configurations': len(alive),
+            'seeds': num_seeds,
+            'bestDistance': mean_distance(alive[0])
+        })
+        if num_seeds >= len(seeds):
+            break
+        alive = alive[:max(1, math.ceil(len(alive) / eta))]
+        if len(alive) == 1:
+            break
+        num_seeds = min(len(seeds), num_seeds * eta)
+    
+    best = alive[0]
+    return {
+        'algorithm': algorithm,
+        'params': candidates[best],
+        'totalDistance': mean_distance(best),
+        'seeds': len(distances[best]),
+        'evaluations': evaluations,
+        'rounds': rounds,
+        'computationTime': (time.time() - start_time) * 1000
+    }